@@ -0,0 +1,245 @@
+"""
+LoanShark AI - Request/Response Compression
+
+- Request bodies sent with `Content-Encoding: gzip` or `zstd` are decompressed
+  incrementally as they arrive, with a cap on decompressed size (zip bombs
+  are rejected with 413 before they are fully inflated).
+- Uploaded files that are themselves gzip/zstd-compressed are detected by
+  their magic bytes and decompressed under the same cap.
+- A payload must be exactly one complete gzip member or zstd frame; truncated
+  or trailing data is rejected with 400.
+- Responses above a size threshold are gzip-compressed when the client sends
+  `Accept-Encoding: gzip`. Streaming (SSE) paths are left uncompressed so
+  events are not buffered.
+
+zstd support requires the optional `zstandard` package.
+"""
+
+import os
+import zlib
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import PlainTextResponse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+MAX_DECOMPRESSED_BYTES = int(
+    os.environ.get("LOANSHARK_MAX_DECOMPRESSED_BYTES", str(50 * 1024 * 1024))
+)
+GZIP_MINIMUM_SIZE = int(os.environ.get("LOANSHARK_GZIP_MINIMUM_SIZE", "1024"))
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Upper bound on output produced per input chunk; keeps memory bounded even
+# for extreme compression ratios
+_CHUNK_OUTPUT_LIMIT = 1024 * 1024
+
+# zstd has no output limit per call. A block inflates to at most 128 KiB from
+# as little as 4 input bytes, so input is fed in slices that stay under
+# _CHUNK_OUTPUT_LIMIT
+_ZSTD_INPUT_SLICE = 4 * _CHUNK_OUTPUT_LIMIT // (128 * 1024)
+
+
+class DecompressionError(ValueError):
+    """Compressed payload is invalid, unsupported, or exceeds the size cap."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StreamDecompressor:
+    """Incremental gzip/zstd decompressor enforcing a decompressed-size cap."""
+
+    def __init__(self, encoding, max_size=MAX_DECOMPRESSED_BYTES):
+        self.max_size = max_size
+        self.size = 0
+
+        if encoding in ("gzip", "x-gzip"):
+            self._zlib = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            self._zstd = None
+        elif encoding == "zstd":
+            if zstandard is None:
+                raise DecompressionError(
+                    "zstd encoding requires the zstandard package", status_code=415
+                )
+            self._zlib = None
+            self._zstd = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            raise DecompressionError(
+                f"Unsupported content encoding: {encoding}", status_code=415
+            )
+
+    def _account(self, output):
+        self.size += len(output)
+        if self.size > self.max_size:
+            raise DecompressionError(
+                "Decompressed payload exceeds size limit", status_code=413
+            )
+        return output
+
+    def decompress(self, data):
+        """Decompress a chunk, raising DecompressionError past the size cap."""
+        try:
+            parts = []
+            if self._zstd is not None:
+                for start in range(0, len(data), _ZSTD_INPUT_SLICE):
+                    if self._zstd.eof:
+                        raise DecompressionError(
+                            "Trailing data after compressed payload"
+                        )
+                    output = self._zstd.decompress(
+                        data[start : start + _ZSTD_INPUT_SLICE]
+                    )
+                    parts.append(self._account(output))
+                return b"".join(parts)
+
+            output = self._zlib.decompress(data, _CHUNK_OUTPUT_LIMIT)
+            parts.append(self._account(output))
+            while self._zlib.unconsumed_tail:
+                output = self._zlib.decompress(
+                    self._zlib.unconsumed_tail, _CHUNK_OUTPUT_LIMIT
+                )
+                parts.append(self._account(output))
+            return b"".join(parts)
+        except DecompressionError:
+            raise
+        except Exception as e:
+            raise DecompressionError(f"Invalid compressed payload: {e}")
+
+    def flush(self):
+        """
+        Finish decompression, raising DecompressionError unless the payload
+        was exactly one complete gzip member or zstd frame.
+        """
+        try:
+            if self._zlib is not None:
+                output = self._account(self._zlib.flush())
+                stream = self._zlib
+            else:
+                output = b""
+                stream = self._zstd
+        except DecompressionError:
+            raise
+        except Exception as e:
+            raise DecompressionError(f"Invalid compressed payload: {e}")
+
+        if not stream.eof:
+            raise DecompressionError("Compressed payload is truncated")
+        if stream.unused_data:
+            raise DecompressionError("Trailing data after compressed payload")
+        return output
+
+
+def sniff_encoding(data):
+    """Detect gzip/zstd payloads by magic bytes (None if uncompressed)."""
+    if data.startswith(_GZIP_MAGIC):
+        return "gzip"
+    if data.startswith(_ZSTD_MAGIC):
+        return "zstd"
+    return None
+
+
+async def read_upload(file, max_size=MAX_DECOMPRESSED_BYTES, chunk_size=64 * 1024):
+    """
+    Read an UploadFile, transparently decompressing gzip/zstd content.
+
+    Uncompressed uploads are subject to the same size cap.
+    """
+    first = await file.read(chunk_size)
+    encoding = sniff_encoding(first)
+    decompressor = StreamDecompressor(encoding, max_size) if encoding else None
+
+    parts = []
+    size = 0
+    chunk = first
+    while chunk:
+        if decompressor is not None:
+            parts.append(decompressor.decompress(chunk))
+        else:
+            size += len(chunk)
+            if size > max_size:
+                raise DecompressionError("Upload exceeds size limit", status_code=413)
+            parts.append(chunk)
+        chunk = await file.read(chunk_size)
+
+    if decompressor is not None:
+        parts.append(decompressor.flush())
+
+    return b"".join(parts)
+
+
+class DecompressRequestMiddleware:
+    """ASGI middleware decoding Content-Encoding: gzip/zstd request bodies."""
+
+    def __init__(self, app, max_size=MAX_DECOMPRESSED_BYTES):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = headers.get(b"content-encoding", b"").decode("latin-1").lower()
+        if encoding in ("", "identity"):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            decompressor = StreamDecompressor(encoding, self.max_size)
+            parts = []
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                parts.append(decompressor.decompress(message.get("body", b"")))
+                more_body = message.get("more_body", False)
+            parts.append(decompressor.flush())
+        except DecompressionError as e:
+            response = PlainTextResponse(str(e), status_code=e.status_code)
+            await response(scope, receive, send)
+            return
+
+        body = b"".join(parts)
+        scope = dict(scope)
+        scope["headers"] = [
+            (key, value)
+            for key, value in scope["headers"]
+            if key not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode("latin-1"))]
+
+        body_sent = False
+
+        async def receive_decompressed():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, receive_decompressed, send)
+
+
+class CompressResponseMiddleware:
+    """GZip responses above a size threshold, skipping streaming paths."""
+
+    def __init__(
+        self, app, minimum_size=GZIP_MINIMUM_SIZE, excluded_paths=("/analyze/stream",)
+    ):
+        self.app = app
+        self.excluded_paths = set(excluded_paths)
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
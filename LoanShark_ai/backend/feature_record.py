@@ -0,0 +1,183 @@
+"""
+LoanShark AI - Compact Feature Records
+
+Each document's features live in one preallocated float64 array, not a
+31-key dict. The slot layout follows feature_names in feature_schema.json,
+so the array already is the model's input row and predict_ml can pass a
+zero-copy view of it instead of building a list from a dict.
+
+Records provide:
+- attribute access to named slots (record.apr_value)
+- a zero-copy NumPy view for the model (record.vector)
+- the dict protocol (get, [], in, keys/items, update, dict(record)) for code
+  that still expects the old feature dict (shadow scorers, JSON logs)
+"""
+
+import json
+from array import array
+
+import numpy as np
+
+
+class FeatureRecord:
+    """Array-backed feature vector; use record_type() to get a named layout."""
+
+    __slots__ = ("_values",)
+
+    feature_names = ()
+    _index = {}
+    _zeros = array("d")
+
+    def __init__(self, values=None):
+        if values is None:
+            self._values = array("d", self._zeros)
+        else:
+            self._values = array("d", values)
+            if len(self._values) != len(self.feature_names):
+                raise ValueError(
+                    f"Expected {len(self.feature_names)} values, got {len(self._values)}"
+                )
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """
+        Build a record from a feature dict. Missing names stay 0; names not in
+        the layout (e.g. a "label" column) are ignored.
+        """
+        record = cls()
+        index = cls._index
+        for name, value in mapping.items():
+            if name in index:
+                record._values[index[name]] = value
+        return record
+
+    @property
+    def vector(self):
+        """Zero-copy float64 NumPy view of the values, in layout order."""
+        return np.frombuffer(self._values, dtype=np.float64)
+
+    def model_row(self, feature_names):
+        """
+        Zero-copy 1 x n view for a model trained on `feature_names`, or None
+        if those names are not a prefix of this record's layout.
+        """
+        n = len(feature_names)
+        if self.feature_names[:n] != tuple(feature_names):
+            return None
+        return self.vector[np.newaxis, :n]
+
+    # --- dict compatibility ---
+
+    def __getitem__(self, name):
+        return self._values[self._index[name]]
+
+    def __setitem__(self, name, value):
+        try:
+            self._values[self._index[name]] = value
+        except KeyError:
+            raise KeyError(f"Unknown feature: {name}") from None
+
+    def get(self, name, default=0):
+        index = self._index.get(name)
+        return default if index is None else self._values[index]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self.feature_names)
+
+    def __len__(self):
+        return len(self.feature_names)
+
+    def keys(self):
+        return self.feature_names
+
+    def items(self):
+        return zip(self.feature_names, self._values)
+
+    def update(self, other):
+        for name, value in other.items():
+            self[name] = value
+
+    def copy(self):
+        return type(self)(self._values)
+
+    def as_dict(self):
+        """Plain {name: value} dict (e.g. for JSON serialization)."""
+        return dict(zip(self.feature_names, self._values))
+
+    def __eq__(self, other):
+        if isinstance(other, FeatureRecord):
+            return (
+                self.feature_names == other.feature_names
+                and self._values == other._values
+            )
+        return NotImplemented
+
+    def __repr__(self):
+        return f"FeatureRecord({json.dumps(self.as_dict())})"
+
+
+def _slot(index):
+    """Property reading/writing one position of the backing array."""
+
+    def get(self):
+        return self._values[index]
+
+    def set(self, value):
+        self._values[index] = value
+
+    return property(get, set)
+
+
+_record_types = {}
+
+
+def record_type(feature_names):
+    """FeatureRecord subclass with one named slot per feature (cached per layout)."""
+    feature_names = tuple(feature_names)
+    if feature_names in _record_types:
+        return _record_types[feature_names]
+
+    clashes = [name for name in feature_names if hasattr(FeatureRecord, name)]
+    if clashes:
+        raise ValueError(f"Feature names clash with FeatureRecord members: {clashes}")
+    if len(set(feature_names)) != len(feature_names):
+        raise ValueError("Duplicate feature names in layout")
+
+    namespace = {
+        "__slots__": (),
+        "feature_names": feature_names,
+        "_index": {name: i for i, name in enumerate(feature_names)},
+        "_zeros": array("d", bytes(8 * len(feature_names))),
+    }
+    namespace.update({name: _slot(i) for i, name in enumerate(feature_names)})
+
+    record_cls = type("FeatureRecord", (FeatureRecord,), namespace)
+    _record_types[feature_names] = record_cls
+    return record_cls
+
+
+def feature_matrix(features_list, feature_names):
+    """
+    Stack records (or plain feature dicts) into an (n_docs, n_features)
+    float64 matrix ordered by `feature_names`.
+
+    A single record whose layout starts with `feature_names` is returned as a
+    view of its own array, without copying.
+    """
+    if len(features_list) == 1 and isinstance(features_list[0], FeatureRecord):
+        row = features_list[0].model_row(feature_names)
+        if row is not None:
+            return row
+
+    n = len(feature_names)
+    names = tuple(feature_names)
+    matrix = np.empty((len(features_list), n))
+    for row, features in zip(matrix, features_list):
+        if isinstance(features, FeatureRecord) and features.feature_names[:n] == names:
+            row[:] = features.vector[:n]
+        else:
+            row[:] = [features.get(name, 0) for name in names]
+    return matrix
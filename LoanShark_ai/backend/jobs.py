@@ -0,0 +1,319 @@
+"""
+LoanShark AI - Batch Job Queue
+
+Durable local queue for large batch submissions, backed by SQLite.
+
+A job is a batch of contract texts. Each text is stored as a job item and
+processed by background worker threads, which claim items transactionally so
+several uvicorn worker processes can share one queue file. Clients poll job
+progress and page through finished results instead of holding one HTTP request
+per contract. Finished jobs are purged after a retention period.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+
+
+DEFAULT_QUEUE_PATH = Path(__file__).parent / "cache" / "jobs.sqlite3"
+
+# Items claimed longer ago than this are assumed orphaned by a crashed worker
+STALE_CLAIM_SECONDS = 600
+
+# How often (seconds) each worker purges jobs past their retention period
+PURGE_EVERY_SECONDS = 3600
+
+
+class JobQueue:
+    """SQLite-backed job queue with transactional item claiming."""
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, retention_seconds=7 * 24 * 3600):
+        self.path = Path(path)
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._workers = []
+        self._stop = threading.Event()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    mode TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_items (
+                    job_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    name TEXT,
+                    text TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    result TEXT,
+                    error TEXT,
+                    claimed_at REAL,
+                    PRIMARY KEY (job_id, idx)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (status)"
+            )
+
+    def _connect(self):
+        """Return this thread's connection (sqlite3 connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, items, mode="full"):
+        """
+        Enqueue a batch. `items` is a list of (name, text) pairs.
+
+        Returns the new job id.
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?)",
+                (job_id, mode, len(items), time.time()),
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, name, text) VALUES (?, ?, ?, ?)",
+                [(job_id, i, name, text) for i, (name, text) in enumerate(items)],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return job_id
+
+    def get_job(self, job_id):
+        """Return job progress, or None if the job does not exist."""
+        conn = self._connect()
+        job = conn.execute(
+            "SELECT mode, total, created_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if job is None:
+            return None
+
+        mode, total, created_at = job
+        counts = dict(
+            conn.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status",
+                (job_id,),
+            ).fetchall()
+        )
+        completed = counts.get("done", 0)
+        failed = counts.get("failed", 0)
+
+        return {
+            "job_id": job_id,
+            "status": "completed" if completed + failed == total else "running",
+            "mode": mode,
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "pending": total - completed - failed,
+            "created_at": created_at,
+        }
+
+    def get_results(self, job_id, offset=0, limit=100):
+        """
+        Return one page of items in submission order.
+
+        Unfinished items are included with their status and a null result, so
+        clients can re-poll a page rather than silently skipping items.
+        """
+        conn = self._connect()
+        job = conn.execute("SELECT total FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+
+        rows = conn.execute(
+            """
+            SELECT idx, name, status, result, error FROM job_items
+            WHERE job_id = ? AND idx >= ? AND idx < ?
+            ORDER BY idx
+            """,
+            (job_id, offset, offset + limit),
+        ).fetchall()
+
+        results = [
+            {
+                "index": idx,
+                "name": name,
+                "status": status,
+                "result": json.loads(result) if result else None,
+                "error": error,
+            }
+            for idx, name, status, result, error in rows
+        ]
+        next_offset = offset + limit if offset + limit < job[0] else None
+
+        return {"job_id": job_id, "results": results, "next_offset": next_offset}
+
+    def _claim(self, batch_size):
+        """Atomically claim up to batch_size pending items."""
+        conn = self._connect()
+        now = time.time()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                """
+                SELECT job_items.job_id, idx, text, mode FROM job_items
+                JOIN jobs ON jobs.id = job_items.job_id
+                WHERE status = 'pending'
+                   OR (status = 'running' AND claimed_at < ?)
+                ORDER BY jobs.created_at, idx LIMIT ?
+                """,
+                (now - STALE_CLAIM_SECONDS, batch_size),
+            ).fetchall()
+            conn.executemany(
+                """
+                UPDATE job_items SET status = 'running', claimed_at = ?
+                WHERE job_id = ? AND idx = ?
+                """,
+                [(now, job_id, idx) for job_id, idx, _text, _mode in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return rows
+
+    def _finish(self, job_id, idx, result=None, error=None):
+        """Record an item's result and drop its text."""
+        conn = self._connect()
+        conn.execute(
+            """
+            UPDATE job_items SET status = ?, result = ?, error = ?, text = NULL
+            WHERE job_id = ? AND idx = ?
+            """,
+            (
+                "failed" if error else "done",
+                json.dumps(result, default=float) if result is not None else None,
+                error,
+                job_id,
+                idx,
+            ),
+        )
+
+    def purge(self):
+        """
+        Delete jobs whose items all finished more than retention_seconds ago.
+
+        Returns the number of jobs deleted.
+        """
+        conn = self._connect()
+        cutoff = time.time() - self.retention_seconds
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A finished item's claimed_at is when its analysis started
+            expired = conn.execute(
+                """
+                SELECT job_id FROM job_items GROUP BY job_id
+                HAVING SUM(status IN ('pending', 'running')) = 0
+                   AND MAX(claimed_at) < ?
+                """,
+                (cutoff,),
+            ).fetchall()
+            conn.executemany("DELETE FROM job_items WHERE job_id = ?", expired)
+            conn.executemany("DELETE FROM jobs WHERE id = ?", expired)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return len(expired)
+
+    def _run_worker(self, analyze, batch_size, poll_interval):
+        """Claim and analyze items until stopped, purging expired jobs hourly."""
+        last_purge = 0.0
+        while not self._stop.is_set():
+            if time.time() - last_purge > PURGE_EVERY_SECONDS:
+                last_purge = time.time()
+                try:
+                    self.purge()
+                except sqlite3.OperationalError as e:
+                    print(f"⚠ Job queue busy: {e}")
+
+            try:
+                rows = self._claim(batch_size)
+            except sqlite3.OperationalError as e:
+                print(f"⚠ Job queue busy: {e}")
+                rows = []
+
+            if not rows:
+                self._stop.wait(poll_interval)
+                continue
+
+            for job_id, idx, text, mode in rows:
+                try:
+                    self._finish(job_id, idx, result=analyze(text, mode))
+                except Exception as e:
+                    try:
+                        self._finish(job_id, idx, error=f"Analysis failed: {str(e)}")
+                    except Exception as finish_error:
+                        # The claim goes stale and the item is retried later
+                        print(f"⚠ Error recording job item: {finish_error}")
+
+    def start_workers(self, analyze, num_workers=2, batch_size=16, poll_interval=1.0):
+        """
+        Start background worker threads.
+
+        `analyze` is called as analyze(text, mode) and must return a
+        JSON-serializable result (e.g. analyze_loan).
+        """
+        self._stop.clear()
+        for i in range(num_workers):
+            worker = threading.Thread(
+                target=self._run_worker,
+                args=(analyze, batch_size, poll_interval),
+                name=f"loanshark-jobs-{i}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def stop_workers(self):
+        """Signal workers to stop and wait for their current batch."""
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+
+def queue_from_env():
+    """Build a JobQueue from LOANSHARK_JOBS* settings, or None if disabled."""
+    enabled = os.environ.get("LOANSHARK_JOBS", "0").lower()
+    if enabled not in ("1", "true", "yes"):
+        return None
+
+    return JobQueue(
+        path=os.environ.get("LOANSHARK_JOBS_PATH", DEFAULT_QUEUE_PATH),
+        retention_seconds=int(
+            os.environ.get("LOANSHARK_JOBS_RETENTION", 7 * 24 * 3600)
+        ),
+    )
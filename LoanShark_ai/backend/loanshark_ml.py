@@ -5,12 +5,17 @@ This module contains all functions needed for analyzing loan contracts.
 Extracted from the trained Jupyter notebook.
 """
 
+import os
 import re
 import json
+import time
+import hashlib
 import joblib
-import numpy as np
 from pathlib import Path
 
+from shadow import submit_shadow
+from feature_record import FeatureRecord, record_type, feature_matrix
+
 
 # === Feature Extraction Functions ===
 
@@ -64,17 +69,60 @@ def count_keywords(text, keywords):
     return count
 
 
-def has_pattern(text, patterns):
-    """Check if any pattern exists in text."""
+def has_pattern(text, patterns, lowered=None):
+    """Check if any pattern exists in text.
+
+    Pass `lowered` (text.lower()) to skip the regex for patterns that cannot
+    match (see may_match).
+    """
     for pattern in patterns:
+        if lowered is not None and not may_match(pattern, lowered):
+            continue
         if re.search(pattern, text, re.IGNORECASE):
             return 1
     return 0
 
 
-def extract_features(text):
-    """Extract all features from loan contract text."""
-    features = {}
+# Characters that end a pattern's leading literal
+_LITERAL_PREFIX = re.compile(r"[^\\.^$*+?{}\[\]()|]*")
+_pattern_literals = {}
+
+
+def pattern_literal(pattern):
+    """Lowercased literal every match of `pattern` starts with ("" if none)."""
+    literal = _pattern_literals.get(pattern)
+    if literal is None:
+        literal = _LITERAL_PREFIX.match(pattern).group()
+        if "|" in pattern:
+            literal = ""
+        elif pattern[len(literal) : len(literal) + 1] in ("?", "*", "{"):
+            # The quantifier makes the last character optional
+            literal = literal[:-1]
+        literal = _pattern_literals[pattern] = literal.lower()
+    return literal
+
+
+def may_match(pattern, lowered):
+    """
+    False if `pattern` (matched case-insensitively) cannot occur in the text
+    whose lowercase is `lowered`, because its leading literal does not.
+
+    A substring check is much cheaper than an IGNORECASE regex scan, and most
+    clause patterns are absent from most contracts.
+    """
+    literal = pattern_literal(pattern)
+    return not literal or literal in lowered
+
+
+def extract_value_features(text, features=None, lowered=None):
+    """
+    Extract numeric value features (APR, fees, term, document statistics).
+
+    Values are written into `features` (a new LoanFeatures record if None),
+    which is returned. `lowered` is text.lower(), if the caller has it.
+    """
+    if features is None:
+        features = LoanFeatures()
 
     # === APR & Cost Features ===
     apr = extract_apr(text)
@@ -93,7 +141,7 @@ def extract_features(text):
     features["fee_word_count"] = count_keywords(text, fee_keywords)
 
     features["mentions_per_100"] = has_pattern(
-        text, [r"\$[0-9]+\s*per\s*\$100", r"per\s*\$100\s*borrowed"]
+        text, [r"\$[0-9]+\s*per\s*\$100", r"per\s*\$100\s*borrowed"], lowered
     )
 
     # === Term & Payment Features ===
@@ -101,21 +149,49 @@ def extract_features(text):
     features["term_days"] = term if term > 0 else 0
     features["term_very_short"] = 1 if 0 < term <= 14 else 0
 
+    # === Document Statistics ===
+    features["doc_length_words"] = len(text.split())
+    features["num_money_amounts"] = len(re.findall(r"\$[0-9,]+", text))
+    features["num_percentages"] = len(re.findall(r"[0-9]+\.?[0-9]*%", text))
+
+    # === Risk Ratios ===
+    if apr > 0 and term > 0:
+        features["apr_to_term_ratio"] = apr / term
+    else:
+        features["apr_to_term_ratio"] = 0
+
+    return features
+
+
+def extract_clause_features(text, features=None, lowered=None):
+    """
+    Extract clause-detection flags (payment, debt cycle, legal, transparency).
+
+    Flags are written into `features` (a new LoanFeatures record if None),
+    which is returned. `lowered` is text.lower(), if the caller has it.
+    """
+    if features is None:
+        features = LoanFeatures()
+    if lowered is None:
+        lowered = text.lower()
+
     features["has_single_payment_due"] = has_pattern(
-        text, [r"single payment", r"due on payday", r"payment due.*payday"]
+        text, [r"single payment", r"due on payday", r"payment due.*payday"], lowered
     )
 
     features["has_monthly_payment"] = has_pattern(
-        text, [r"monthly", r"payment schedule.*monthly"]
+        text, [r"monthly", r"payment schedule.*monthly"], lowered
     )
 
     # === Clause Detection ===
     features["has_rollover_or_renewal"] = has_pattern(
-        text, [r"rollover", r"renew", r"renewal", r"extend", r"automatically renew"]
+        text,
+        [r"rollover", r"renew", r"renewal", r"extend", r"automatically renew"],
+        lowered,
     )
 
     features["has_balloon_payment"] = has_pattern(
-        text, [r"balloon payment", r"balloon"]
+        text, [r"balloon payment", r"balloon"], lowered
     )
 
     # Auto-debit: require authorization + debit language CLOSE TOGETHER
@@ -139,14 +215,15 @@ def extract_features(text):
             r"may revoke",
             r"can opt out",
         ],
+        lowered,
     )
 
     # Only detect auto-debit if we find authorization + debit close together
     # Pattern: (authorize|permission|grant) within 50 chars of (debit|withdraw|ACH)
-    auto_debit_pattern = re.search(
-        r"(authorize|permission|grant|allow).{0,50}(debit|withdraw|ACH|bank account)",
+    auto_debit_pattern = has_pattern(
         text,
-        re.IGNORECASE,
+        [r"(authorize|permission|grant|allow).{0,50}(debit|withdraw|ACH|bank account)"],
+        lowered,
     )
 
     # Only flag if pattern found AND no optional language
@@ -185,6 +262,8 @@ def extract_features(text):
     # Find continuous debit pattern
     continuous_match = None
     for pattern in continuous_debit_patterns:
+        if not may_match(pattern, lowered):
+            continue
         match = re.search(pattern, text, re.IGNORECASE)
         if match:
             continuous_match = match
@@ -215,37 +294,42 @@ def extract_features(text):
     features["has_continuous_debit"] = has_continuous_debit
 
     features["has_wage_assignment"] = has_pattern(
-        text, [r"wage assignment", r"paycheck.*assignment"]
+        text, [r"wage assignment", r"paycheck.*assignment"], lowered
     )
 
     features["has_arbitration"] = has_pattern(
-        text, [r"arbitration", r"binding arbitration"]
+        text, [r"arbitration", r"binding arbitration"], lowered
     )
 
     features["has_class_action_waiver"] = has_pattern(
-        text, [r"class action waiver", r"waive.*class action", r"no class action"]
+        text,
+        [r"class action waiver", r"waive.*class action", r"no class action"],
+        lowered,
     )
 
     features["has_jury_waiver"] = has_pattern(
-        text, [r"jury.*waiver", r"waive.*jury", r"no jury trial"]
+        text, [r"jury.*waiver", r"waive.*jury", r"no jury trial"], lowered
     )
 
     features["has_confession_of_judgment"] = has_pattern(
-        text, [r"confession of judgment", r"confess.*judgment"]
+        text, [r"confession of judgment", r"confess.*judgment"], lowered
     )
 
     features["has_employer_contact"] = has_pattern(
-        text, [r"contact.*employer", r"employer.*collection"]
+        text, [r"contact.*employer", r"employer.*collection"], lowered
     )
 
     # === Transparency Features ===
     features["has_clear_disclosure"] = has_pattern(
-        text, [r"APR.*disclosed", r"fee schedule.*included", r"clearly.*disclosed"]
+        text,
+        [r"APR.*disclosed", r"fee schedule.*included", r"clearly.*disclosed"],
+        lowered,
     )
 
     features["has_transparency_language"] = has_pattern(
         text,
         [r"transparency", r"disclosure", r"right to sue", r"may revoke", r"can cancel"],
+        lowered,
     )
 
     features["has_fee_ambiguity"] = has_pattern(
@@ -256,86 +340,354 @@ def extract_features(text):
             r"see external schedule",
             r"additional fees",
         ],
+        lowered,
     )
 
-    # === Document Statistics ===
-    features["doc_length_words"] = len(text.split())
-    features["num_money_amounts"] = len(re.findall(r"\$[0-9,]+", text))
-    features["num_percentages"] = len(re.findall(r"[0-9]+\.?[0-9]*%", text))
+    return features
 
-    # === Risk Ratios ===
-    if apr > 0 and term > 0:
-        features["apr_to_term_ratio"] = apr / term
-    else:
-        features["apr_to_term_ratio"] = 0
 
-    return features
+def extract_features(text):
+    """Extract all features from loan contract text."""
+    lowered = text.lower()
+    features = extract_value_features(text, lowered=lowered)
+    return extract_clause_features(text, features, lowered)
 
 
 # === ML Inference ===
 
+MODEL_DIR = Path(__file__).parent.parent / "model" / "models"
+MODEL_PATH = MODEL_DIR / "loanshark_model.joblib"
+SCHEMA_PATH = MODEL_DIR / "feature_schema.json"
+
+# Online-update checkpoints (untracked; written by online_learning.py)
+ONLINE_DIR = MODEL_DIR / "online"
+ONLINE_SCHEMA_PATH = ONLINE_DIR / "feature_schema.json"
+
+# How often (seconds) to stat the schemas for a model swapped by another process
+MODEL_CHECK_SECONDS = 5
+
+# Every feature the extractors produce, in training order
+FEATURE_NAMES = (
+    "apr_value",
+    "apr_missing",
+    "apr_over_100",
+    "apr_over_300",
+    "late_fee_value",
+    "origination_fee_value",
+    "service_fee_value",
+    "renewal_fee_value",
+    "fee_word_count",
+    "mentions_per_100",
+    "term_days",
+    "term_very_short",
+    "has_single_payment_due",
+    "has_monthly_payment",
+    "has_rollover_or_renewal",
+    "has_balloon_payment",
+    "has_auto_debit",
+    "has_continuous_debit",
+    "has_wage_assignment",
+    "has_arbitration",
+    "has_class_action_waiver",
+    "has_jury_waiver",
+    "has_confession_of_judgment",
+    "has_employer_contact",
+    "has_clear_disclosure",
+    "has_transparency_language",
+    "has_fee_ambiguity",
+    "doc_length_words",
+    "num_money_amounts",
+    "num_percentages",
+    "apr_to_term_ratio",
+)
+
+
+def load_feature_layout(schema_path=SCHEMA_PATH):
+    """
+    Record slot order: the schema's feature_names first, so a record's array
+    is the model input row as-is, then any extracted feature it doesn't list.
+    """
+    try:
+        with open(schema_path, "r") as f:
+            schema_names = json.load(f).get("feature_names", [])
+    except Exception:
+        schema_names = []
+    extra = tuple(name for name in FEATURE_NAMES if name not in schema_names)
+    return tuple(schema_names) + extra
+
+
+# Per-document feature record (see feature_record.py)
+LoanFeatures = record_type(load_feature_layout())
+
+
+def as_feature_record(features):
+    """Return `features` as a record; plain feature dicts are converted."""
+    if isinstance(features, FeatureRecord):
+        return features
+    return LoanFeatures.from_mapping(features)
+
+
+def features_dict(features):
+    """Plain, JSON-serializable dict of a record or feature dict."""
+    if isinstance(features, FeatureRecord):
+        return features.as_dict()
+    return features
+
+
 _model = None
 _schema = None
+_artifact_mtimes = None
+_checked_at = 0.0
 
 
-def load_model_and_schema():
-    """Load trained model and feature schema."""
-    global _model, _schema
+def get_model_path(schema):
+    """Resolve the model artifact named by the schema ("model_file"), or the default."""
+    model_file = schema.get("model_file") if schema else None
+    return MODEL_DIR / model_file if model_file else MODEL_PATH
 
-    if _model is not None and _schema is not None:
-        return _model, _schema
+
+def artifact_version(*paths):
+    """Hash artifact file contents into a short version string."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def base_model_version():
+    """Version of the batch-trained model and feature_schema.json."""
+    with open(SCHEMA_PATH, "r") as f:
+        schema = json.load(f)
+    return artifact_version(get_model_path(schema), SCHEMA_PATH)
+
+
+def read_active_schema():
+    """
+    (schema, schema path) to serve: the online checkpoint if it was trained
+    from the current batch-trained model, else feature_schema.json. Retraining
+    therefore supersedes older online updates.
+    """
+    with open(SCHEMA_PATH, "r") as f:
+        schema = json.load(f)
 
     try:
-        model_path = (
-            Path(__file__).parent.parent / "model" / "models" / "loanshark_model.joblib"
-        )
-        schema_path = (
-            Path(__file__).parent.parent / "model" / "models" / "feature_schema.json"
-        )
+        with open(ONLINE_SCHEMA_PATH, "r") as f:
+            online_schema = json.load(f)
+    except (OSError, ValueError):
+        return schema, SCHEMA_PATH
+
+    if online_schema.get("base_version") == base_model_version():
+        return online_schema, ONLINE_SCHEMA_PATH
+    return schema, SCHEMA_PATH
+
+
+def _mtime(path):
+    """st_mtime_ns of `path`, or None if there is no such file."""
+    if path is None:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+# schema path -> (schema mtime, model path it names), re-read when mtime changes
+_schema_model_paths = {}
 
-        _model = joblib.load(model_path)
+
+def _schema_model_path(schema_path, schema_mtime):
+    """Model path named by the schema file at `schema_path` (None if unreadable)."""
+    cached = _schema_model_paths.get(schema_path)
+    if cached is not None and cached[0] == schema_mtime:
+        return cached[1]
+
+    try:
         with open(schema_path, "r") as f:
-            _schema = json.load(f)
+            model_path = get_model_path(json.load(f))
+    except (OSError, ValueError):
+        model_path = None
+    _schema_model_paths[schema_path] = (schema_mtime, model_path)
+    return model_path
+
+
+def artifact_mtimes():
+    """
+    Modification times of both schemas and of the model file each one names
+    (None if missing), so a model file replaced under an unchanged schema is
+    noticed too.
+    """
+    mtimes = []
+    for schema_path in (SCHEMA_PATH, ONLINE_SCHEMA_PATH):
+        schema_mtime = _mtime(schema_path)
+        mtimes.append(schema_mtime)
+        mtimes.append(_mtime(_schema_model_path(schema_path, schema_mtime)))
+    return tuple(mtimes)
+
+
+def load_model_and_schema(refresh=False):
+    """
+    Load trained model and feature schema.
+
+    The loaded model is reused, but the schema and model files are re-checked
+    every MODEL_CHECK_SECONDS (immediately with refresh=True), so a retrain or an
+    online update written by another process is picked up.
+    """
+    global _model, _schema, _artifact_mtimes, _checked_at
 
-        return _model, _schema
+    if _model is not None and _schema is not None:
+        if not refresh and time.monotonic() - _checked_at < MODEL_CHECK_SECONDS:
+            return _model, _schema
+        _checked_at = time.monotonic()
+        if artifact_mtimes() == _artifact_mtimes:
+            return _model, _schema
+
+    try:
+        mtimes = artifact_mtimes()
+        schema, _schema_path = read_active_schema()
+        model = joblib.load(get_model_path(schema))
     except Exception as e:
         print(f"⚠ Error loading model: {e}")
-        return None, None
+        # Keep serving the model already loaded, if any
+        return _model, _schema
+
+    _model, _schema, _artifact_mtimes = model, schema, mtimes
+    _checked_at = time.monotonic()
+    return _model, _schema
+
+
+def set_model(model, schema=None):
+    """Swap the in-process model (and optionally schema) after an online update."""
+    global _model, _schema, _artifact_mtimes, _checked_at
+
+    _model = model
+    if schema is not None:
+        _schema = schema
+    _artifact_mtimes = artifact_mtimes()
+    _checked_at = time.monotonic()
+
+
+# === Model Input ===
+
+# "features": dense vector of hand-crafted features (default)
+# "hashed_ngrams": sparse hashed word n-grams, optionally stacked with features
+MODEL_MODES = ("features", "hashed_ngrams")
+
+_vectorizers = {}
+
+
+def get_hashing_vectorizer(schema):
+    """Stateless HashingVectorizer configured by schema["hashing"] (cached per config)."""
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    hashing = schema.get("hashing", {})
+    n_features = hashing.get("n_features", 2**18)
+    ngram_range = tuple(hashing.get("ngram_range", [1, 2]))
+
+    key = (n_features, ngram_range)
+    if key not in _vectorizers:
+        _vectorizers[key] = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=ngram_range,
+            alternate_sign=False,
+            norm="l2",
+        )
+    return _vectorizers[key]
+
+
+def build_model_input(texts, features_list, schema):
+    """
+    Build the model input matrix for a batch of documents.
+
+    Returns a dense array in "features" mode, or a SciPy sparse CSR matrix in
+    "hashed_ngrams" mode (hashed n-grams, with the hand-crafted features
+    appended when schema["hashing"]["stack_features"] is true).
+    """
+    mode = schema.get("model_mode", "features")
+    if mode not in MODEL_MODES:
+        raise ValueError(f"Unknown model mode: {mode}")
 
+    dense = feature_matrix(features_list, schema["feature_names"])
+    if mode == "features":
+        return dense
 
-def predict_ml(text, model=None, schema=None):
-    """Get ML prediction for loan text."""
+    from scipy import sparse
+
+    hashed = get_hashing_vectorizer(schema).transform(texts)
+    if not schema.get("hashing", {}).get("stack_features", True):
+        return hashed
+
+    return sparse.hstack([hashed, sparse.csr_matrix(dense)], format="csr")
+
+
+def predict_ml(text, model=None, schema=None, features=None):
+    """Get ML prediction for loan text (reuses `features` if already extracted)."""
+    if features is None:
+        features = extract_features(text)
+
+    prediction = _predict_ml(text, features, model, schema)
+    if prediction is None:
+        return None
+    return {**prediction, "features": features_dict(features)}
+
+
+def _predict_ml(text, features, model=None, schema=None):
+    """ml_prob and ml_score for extracted `features` (None without a model)."""
     if model is None or schema is None:
         model, schema = load_model_and_schema()
 
     if model is None:
         return None
 
-    features_dict = extract_features(text)
-
-    # Convert to feature vector in correct order
-    feature_vector = [features_dict.get(name, 0) for name in schema["feature_names"]]
-    feature_vector = np.array(feature_vector).reshape(1, -1)
-
     try:
-        prob = model.predict_proba(feature_vector)[0][1]
+        model_input = build_model_input([text], [features], schema)
+        prob = model.predict_proba(model_input)[0][1]
         ml_score = round(prob * 100)
-        return {"ml_prob": prob, "ml_score": ml_score, "features": features_dict}
+        return {"ml_prob": prob, "ml_score": ml_score}
     except Exception as e:
         print(f"⚠ Prediction error: {e}")
         return None
 
 
+def predict_ml_batch(texts, model=None, schema=None, features_list=None):
+    """Get ML predictions for many texts with a single predict_proba call."""
+    if model is None or schema is None:
+        model, schema = load_model_and_schema()
+
+    if model is None:
+        return [None] * len(texts)
+
+    if features_list is None:
+        features_list = [extract_features(text) for text in texts]
+
+    try:
+        model_input = build_model_input(texts, features_list, schema)
+        probs = model.predict_proba(model_input)[:, 1]
+    except Exception as e:
+        print(f"⚠ Prediction error: {e}")
+        return [None] * len(texts)
+
+    return [
+        {
+            "ml_prob": prob,
+            "ml_score": round(prob * 100),
+            "features": features_dict(features),
+        }
+        for prob, features in zip(probs, features_list)
+    ]
+
+
 # === Scoring Logic ===
 
 
 def calculate_rule_score(features):
     """Calculate rule-based score (0-100) with hackathon-grade weights."""
+    features = as_feature_record(features)
     score = 0
 
     # === Cost Points (max 40) ===
-    apr = features.get("apr_value", 0)
-    apr_missing = features.get("apr_missing", 0)
+    apr = features.apr_value
+    apr_missing = features.apr_missing
 
     if apr_missing:
         score += 15  # Transparency penalty
@@ -347,47 +699,44 @@ def calculate_rule_score(features):
         score += 10
 
     # === Fees Points (max 20) ===
-    if features.get("mentions_per_100", 0):
+    if features.mentions_per_100:
         score += 20  # "$X per $100" is extremely predatory
-    elif (
-        features.get("service_fee_value", 0) > 0
-        or features.get("origination_fee_value", 0) > 0
-    ):
+    elif features.service_fee_value > 0 or features.origination_fee_value > 0:
         score += 5
 
-    if features.get("has_fee_ambiguity", 0):
+    if features.has_fee_ambiguity:
         score += 10  # "fees may apply" / "may change"
 
     # === Debt Cycle Points (max 20) ===
-    if features.get("has_rollover_or_renewal", 0):
+    if features.has_rollover_or_renewal:
         score += 20  # Rollover/renewal is a major trap
 
-    if features.get("has_balloon_payment", 0):
+    if features.has_balloon_payment:
         score += 10
 
-    if features.get("term_very_short", 0):
+    if features.term_very_short:
         score += 10  # 14 days or less
 
     # === Legal/Collection Traps (max 20) ===
-    if features.get("has_confession_of_judgment", 0):
+    if features.has_confession_of_judgment:
         score += 20  # Extremely predatory
 
-    if features.get("has_wage_assignment", 0):
+    if features.has_wage_assignment:
         score += 15
 
-    if features.get("has_arbitration", 0):
+    if features.has_arbitration:
         score += 10
 
-    if features.get("has_class_action_waiver", 0):
+    if features.has_class_action_waiver:
         score += 10
 
-    if features.get("has_jury_waiver", 0):
+    if features.has_jury_waiver:
         score += 5
 
-    if features.get("has_continuous_debit", 0) or features.get("has_auto_debit", 0):
+    if features.has_continuous_debit or features.has_auto_debit:
         score += 10
 
-    if features.get("has_employer_contact", 0):
+    if features.has_employer_contact:
         score += 7
 
     # Don't reduce score for positive signals - only penalties
@@ -398,16 +747,17 @@ def calculate_rule_score(features):
 
 def calculate_confidence(features):
     """Calculate confidence score based on extraction quality and text completeness."""
+    features = as_feature_record(features)
     confidence_score = 100
 
     # Critical missing information
-    if features.get("apr_missing", 0):
+    if features.apr_missing:
         confidence_score -= 25  # APR is critical
-    if features.get("term_days", 0) == 0:
+    if features.term_days == 0:
         confidence_score -= 15  # Term is important
 
     # Document quality indicators
-    doc_length = features.get("doc_length_words", 0)
+    doc_length = features.doc_length_words
     if doc_length < 30:
         confidence_score -= 30  # Very short, likely incomplete
     elif doc_length < 50:
@@ -416,8 +766,8 @@ def calculate_confidence(features):
         confidence_score -= 10  # Moderate length
 
     # Financial indicators present (good sign)
-    num_money = features.get("num_money_amounts", 0)
-    num_percent = features.get("num_percentages", 0)
+    num_money = features.num_money_amounts
+    num_percent = features.num_percentages
 
     if num_money == 0 and num_percent == 0:
         confidence_score -= 20  # No financial data at all
@@ -425,7 +775,7 @@ def calculate_confidence(features):
         confidence_score -= 10  # Minimal financial data
 
     # Fee information completeness
-    if features.get("fee_word_count", 0) < 2:
+    if features.fee_word_count < 2:
         confidence_score -= 10  # Very little fee information
 
     # Ensure score is in valid range
@@ -440,14 +790,29 @@ def calculate_confidence(features):
         return "Low"
 
 
-def hybrid_score(text, ml_result=None):
-    """Calculate final hybrid score combining rules + ML."""
-    features = extract_features(text)
+def hybrid_score(text, ml_result=None, features=None):
+    """Calculate final hybrid score combining rules + ML.
+
+    `features` may be a LoanFeatures record or a plain feature dict; the
+    result's "features" is always a plain dict.
+    """
+    if features is None:
+        features = extract_features(text)
+    else:
+        features = as_feature_record(features)
+
+    result = _hybrid_score(text, features, ml_result)
+    result["features"] = features.as_dict()
+    return result
+
+
+def _hybrid_score(text, features, ml_result=None):
+    """hybrid_score for a LoanFeatures record, without the "features" dict."""
     rule_score = calculate_rule_score(features)
     confidence = calculate_confidence(features)
 
     if ml_result is None:
-        ml_result = predict_ml(text)
+        ml_result = _predict_ml(text, features)
 
     if ml_result is None:
         final_score = rule_score
@@ -458,7 +823,7 @@ def hybrid_score(text, ml_result=None):
         ml_prob = ml_result["ml_prob"]
 
         # Adaptive weighting
-        if features.get("apr_missing", 0) and features.get("fee_word_count", 0) < 3:
+        if features.apr_missing and features.fee_word_count < 3:
             rule_weight = 0.9
             ml_weight = 0.1
         elif confidence == "High":
@@ -476,14 +841,10 @@ def hybrid_score(text, ml_result=None):
             final_score = max(final_score, int(rule_score * 0.7))
 
     # Hard floor rules for score
-    apr = features.get("apr_value", 0)
+    apr = features.apr_value
     if apr > 400:
         final_score = max(final_score, 85)
-    if (
-        features.get("has_arbitration", 0)
-        and features.get("has_class_action_waiver", 0)
-        and apr > 100
-    ):
+    if features.has_arbitration and features.has_class_action_waiver and apr > 100:
         final_score = max(final_score, 75)
 
     # Map score to label
@@ -499,28 +860,28 @@ def hybrid_score(text, ml_result=None):
     # === LABEL FLOOR RULES (prevent false "Safe" labels) ===
     # If any legal trap exists, minimum = Caution
     if (
-        features.get("has_arbitration", 0)
-        or features.get("has_class_action_waiver", 0)
-        or features.get("has_confession_of_judgment", 0)
+        features.has_arbitration
+        or features.has_class_action_waiver
+        or features.has_confession_of_judgment
     ):
         if label == "Safe":
             label = "Caution"
 
     # If major predatory signals, minimum = High Risk
     if (
-        features.get("has_rollover_or_renewal", 0)
-        or features.get("mentions_per_100", 0)
+        features.has_rollover_or_renewal
+        or features.mentions_per_100
         or apr >= 100
-        or features.get("term_very_short", 0)
+        or features.term_very_short
     ):
         if label in ["Safe", "Caution"]:
             label = "High Risk"
 
     # If extreme predatory combo, minimum = Predatory
     if apr >= 300 and (
-        features.get("has_rollover_or_renewal", 0)
-        or features.get("has_arbitration", 0)
-        or features.get("has_continuous_debit", 0)
+        features.has_rollover_or_renewal
+        or features.has_arbitration
+        or features.has_continuous_debit
     ):
         label = "Predatory"
 
@@ -531,7 +892,6 @@ def hybrid_score(text, ml_result=None):
         "rule_score": rule_score,
         "ml_score": ml_score,
         "ml_prob": ml_prob,
-        "features": features,
     }
 
 
@@ -540,9 +900,10 @@ def hybrid_score(text, ml_result=None):
 
 def generate_reasons(features):
     """Generate priority-based reasons for the risk score."""
+    features = as_feature_record(features)
     reasons = []
 
-    apr = features.get("apr_value", 0)
+    apr = features.apr_value
 
     # Priority 1: Extreme APR
     if apr > 300:
@@ -557,70 +918,67 @@ def generate_reasons(features):
         )
 
     # Priority 2: Fee structure
-    if features.get("mentions_per_100", 0):
+    if features.mentions_per_100:
         reasons.append(
             "Fees charged per $100 borrowed compound quickly on short-term loans."
         )
 
     # Priority 3: Debt cycle
-    if features.get("has_rollover_or_renewal", 0):
+    if features.has_rollover_or_renewal:
         reasons.append(
             "Loan includes rollover/renewal clauses that can trap borrowers in debt cycles."
         )
 
-    if features.get("term_very_short", 0):
+    if features.term_very_short:
         reasons.append(
             "Very short repayment term (14 days or less) makes it difficult to repay without rolling over."
         )
 
     # Priority 4: Legal traps
-    if features.get("has_arbitration", 0) and features.get(
-        "has_class_action_waiver", 0
-    ):
+    if features.has_arbitration and features.has_class_action_waiver:
         reasons.append(
             "Mandatory arbitration + class action waiver severely limits your legal rights."
         )
-    elif features.get("has_arbitration", 0):
+    elif features.has_arbitration:
         reasons.append(
             "Mandatory arbitration clause found (you waive your right to sue in court)."
         )
-    elif features.get("has_class_action_waiver", 0):
+    elif features.has_class_action_waiver:
         reasons.append("Class action waiver prevents you from joining group lawsuits.")
 
     # Priority 5: Payment access
-    if features.get("has_continuous_debit", 0):
+    if features.has_continuous_debit:
         reasons.append(
             "Lender can repeatedly debit your account, risking overdraft fees and loss of control."
         )
-    elif features.get("has_auto_debit", 0):
+    elif features.has_auto_debit:
         reasons.append(
             "Automatic debit authorization may make it difficult to manage payments."
         )
 
     # Priority 6: Collection tactics
-    if features.get("has_employer_contact", 0):
+    if features.has_employer_contact:
         reasons.append(
             "Lender may contact your employer for collection, risking your job."
         )
 
-    if features.get("has_wage_assignment", 0):
+    if features.has_wage_assignment:
         reasons.append("Wage assignment gives lender direct access to your paycheck.")
 
     # Only add "no red flags" if score is actually low AND no legal traps
     if (
         len(reasons) == 0
         and apr < 36
-        and not features.get("has_arbitration", 0)
-        and not features.get("has_class_action_waiver", 0)
+        and not features.has_arbitration
+        and not features.has_class_action_waiver
     ):
         reasons.append("No major red flags detected in this contract.")
 
     return reasons[:5]
 
 
-def extract_highlights(text, features):
-    """Extract highlighted snippets from the contract with clean boundaries."""
-    highlights = []
+def _iter_raw_highlights(text, features):
+    """Yield highlighted snippets in priority order (may contain duplicates)."""
 
     def clean_snippet(snippet):
         """Clean snippet: replace newlines, trim whitespace, ensure word boundaries."""
@@ -640,60 +998,50 @@ def extract_highlights(text, features):
 
     # APR highlight
     apr_match = re.search(r"(APR[:\s]+[0-9]+\.?[0-9]*%)", text, re.IGNORECASE)
-    if apr_match and features.get("apr_value", 0) > 100:
-        highlights.append(
-            {"text": clean_snippet(apr_match.group(1)), "category": "ExcessiveCost"}
-        )
+    if apr_match and features.apr_value > 100:
+        yield {"text": clean_snippet(apr_match.group(1)), "category": "ExcessiveCost"}
 
     # Fee per $100 pattern
     per100_match = re.search(
         r"(\$[0-9]+\s*per\s*\$100[^\n]{0,60})", text, re.IGNORECASE
     )
     if per100_match:
-        highlights.append(
-            {
-                "text": clean_snippet(per100_match.group(1)),
-                "category": "ExcessiveCost",
-            }
-        )
+        yield {
+            "text": clean_snippet(per100_match.group(1)),
+            "category": "ExcessiveCost",
+        }
 
     # Arbitration - always add if detected
-    if features.get("has_arbitration", 0):
+    if features.has_arbitration:
         arb_match = re.search(
             r"([^\n]{0,30}(?:binding )?arbitration[^\n]{0,50})", text, re.IGNORECASE
         )
         if arb_match:
-            highlights.append(
-                {"text": clean_snippet(arb_match.group(1)), "category": "LegalTrap"}
-            )
+            yield {"text": clean_snippet(arb_match.group(1)), "category": "LegalTrap"}
 
     # Class action waiver
-    if features.get("has_class_action_waiver", 0):
+    if features.has_class_action_waiver:
         class_match = re.search(
             r"([^\n]{0,20}class action waiver[^\n]{0,30})", text, re.IGNORECASE
         )
         if class_match:
-            highlights.append(
-                {"text": clean_snippet(class_match.group(1)), "category": "LegalTrap"}
-            )
+            yield {"text": clean_snippet(class_match.group(1)), "category": "LegalTrap"}
 
     # Rollover/renewal
-    if features.get("has_rollover_or_renewal", 0):
+    if features.has_rollover_or_renewal:
         rollover_match = re.search(
             r"([^\n]{0,20}(?:automatically renew|rollover|may be renewed|renew)[^\n]{0,50})",
             text,
             re.IGNORECASE,
         )
         if rollover_match:
-            highlights.append(
-                {
-                    "text": clean_snippet(rollover_match.group(1)),
-                    "category": "DebtCycle",
-                }
-            )
+            yield {
+                "text": clean_snippet(rollover_match.group(1)),
+                "category": "DebtCycle",
+            }
 
     # Continuous debit - only extract if feature is flagged (negation shield already applied in feature detection)
-    if features.get("has_continuous_debit", 0):
+    if features.has_continuous_debit:
         # Look for positive lender action signals (not negations)
         debit_match = re.search(
             r"([^\n]{0,30}(?:authorizes? lender|lender may|initiate.*debit|repeatedly debit|multiple.*withdrawal|until paid)[^\n]{0,50})",
@@ -706,60 +1054,117 @@ def extract_highlights(text, features):
             if not re.search(
                 r"(\bno\b|\bnot\b|does not|may not)", snippet, re.IGNORECASE
             ):
-                highlights.append(
-                    {
-                        "text": clean_snippet(snippet),
-                        "category": "PaymentAccess",
-                    }
-                )
+                yield {
+                    "text": clean_snippet(snippet),
+                    "category": "PaymentAccess",
+                }
 
     # Auto-debit (only if detected - more strict now)
-    if features.get("has_auto_debit", 0):
+    if features.has_auto_debit:
         auto_debit_match = re.search(
             r"([^\n]{0,30}(?:authorize|permission|grant)[^\n]{0,30}(?:debit|withdraw|ACH|bank account)[^\n]{0,40})",
             text,
             re.IGNORECASE,
         )
         if auto_debit_match:
-            highlights.append(
-                {
-                    "text": clean_snippet(auto_debit_match.group(1)),
-                    "category": "PaymentAccess",
-                }
-            )
+            yield {
+                "text": clean_snippet(auto_debit_match.group(1)),
+                "category": "PaymentAccess",
+            }
 
     # Employer contact
-    if features.get("has_employer_contact", 0):
+    if features.has_employer_contact:
         employer_match = re.search(
             r"([^\n]{0,20}contact.*employer[^\n]{0,30})", text, re.IGNORECASE
         )
         if employer_match:
-            highlights.append(
-                {
-                    "text": clean_snippet(employer_match.group(1)),
-                    "category": "Collection",
-                }
-            )
+            yield {
+                "text": clean_snippet(employer_match.group(1)),
+                "category": "Collection",
+            }
+
 
-    # Deduplicate highlights by (category, text)
+def iter_highlights(text, features, limit=6):
+    """Yield unique highlights by (category, text), stopping after `limit`."""
+    features = as_feature_record(features)
     seen = set()
-    unique_highlights = []
-    for h in highlights:
+    for h in _iter_raw_highlights(text, features):
         key = (h["category"], h["text"])
         if key not in seen:
             seen.add(key)
-            unique_highlights.append(h)
+            yield h
+            if len(seen) >= limit:
+                return
 
-    return unique_highlights[:6]
 
+def extract_highlights(text, features):
+    """Extract highlighted snippets from the contract with clean boundaries."""
+    return list(iter_highlights(text, features))
+
+
+# === Analysis Modes ===
+
+ANALYSIS_MODES = ("full", "triage")
+
+# APR above this fixes the outcome: score floor 85 maps to "Predatory"
+TRIAGE_APR_FLOOR = 400
+TRIAGE_APR_FLOOR_SCORE = 85
+
+
+def apr_floor_reached(text):
+    """
+    True if APR > TRIAGE_APR_FLOOR, which fixes the label at "Predatory".
+
+    APR is read from the full text, as in extract_features, so the shortcut
+    always agrees with full analysis.
+    """
+    return extract_apr(text) > TRIAGE_APR_FLOOR
+
+
+def triage_loan(text):
+    """
+    Fast triage: score + label only, without reasons or highlights.
+
+    Short-circuits on the APR > 400 hard floor, which fixes the label at
+    "Predatory" before any other feature is extracted. The exact score is
+    not computed then: "score" is the floor score (a lower bound on the
+    exact score) and "score_is_floor" is True. Otherwise score and label are
+    identical to full analysis.
+    """
+    if apr_floor_reached(text):
+        return {
+            "score": TRIAGE_APR_FLOOR_SCORE,
+            "score_is_floor": True,
+            "label": "Predatory",
+            "confidence": None,
+            "reasons": [],
+            "highlights": [],
+            "debug": {"mode": "triage", "short_circuit": "apr_over_400"},
+        }
+
+    features = extract_features(text)
+    result = _hybrid_score(text, features)
+    submit_shadow(features, result, text)
+
+    return {
+        "score": result["score"],
+        "label": result["label"],
+        "confidence": result["confidence"],
+        "reasons": [],
+        "highlights": [],
+        "debug": {
+            "mode": "triage",
+            "short_circuit": None,
+            "rule_score": result["rule_score"],
+            "ml_score": result["ml_score"],
+            "ml_prob": result["ml_prob"],
+        },
+    }
 
-def analyze_loan(text):
-    """Complete analysis pipeline - returns API-ready response."""
-    result = hybrid_score(text)
-    reasons = generate_reasons(result["features"])
-    highlights = extract_highlights(text, result["features"])
 
-    response = {
+def build_response(result, reasons, highlights):
+    """Assemble the API response from hybrid_score output and explanations."""
+    return {
         "score": result["score"],
         "label": result["label"],
         "confidence": result["confidence"],
@@ -772,4 +1177,71 @@ def analyze_loan(text):
         },
     }
 
+
+def analyze_loan(text, mode="full", result_cache=None):
+    """Complete analysis pipeline - returns API-ready response.
+
+    mode="triage" returns score/label only (see triage_loan).
+    result_cache (a ResultCache) returns stored results for previously seen text.
+    """
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode: {mode}")
+
+    if result_cache is not None:
+        cached = result_cache.get(text, mode)
+        if cached is not None:
+            return cached
+
+    if mode == "triage":
+        response = triage_loan(text)
+        if result_cache is not None:
+            result_cache.put(text, response, mode)
+        return response
+
+    features = extract_features(text)
+    result = _hybrid_score(text, features)
+    submit_shadow(features, result, text)
+    reasons = generate_reasons(features)
+    highlights = extract_highlights(text, features)
+
+    response = build_response(result, reasons, highlights)
+
+    if result_cache is not None:
+        result_cache.put(text, response, mode)
+
     return response
+
+
+def analyze_loan_stream(text):
+    """
+    Progressive analysis - yields (event, data) pairs as each stage finishes.
+
+    Stages: "floor" (only if the APR hard floor fixes the label), "score",
+    "reasons", one "highlight" per snippet, then "result" with the same
+    response analyze_loan would return.
+    """
+    if apr_floor_reached(text):
+        yield "floor", {
+            "score": TRIAGE_APR_FLOOR_SCORE,
+            "score_is_floor": True,
+            "label": "Predatory",
+        }
+
+    features = extract_features(text)
+    result = _hybrid_score(text, features)
+    submit_shadow(features, result, text)
+    yield "score", {
+        "score": result["score"],
+        "label": result["label"],
+        "confidence": result["confidence"],
+    }
+
+    reasons = generate_reasons(features)
+    yield "reasons", {"reasons": reasons}
+
+    highlights = []
+    for highlight in iter_highlights(text, features):
+        highlights.append(highlight)
+        yield "highlight", highlight
+
+    yield "result", build_response(result, reasons, highlights)
@@ -3,13 +3,30 @@ LoanShark AI - FastAPI Backend
 Predatory Loan Detection API
 """
 
-from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi import FastAPI, HTTPException, File, UploadFile, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal
+import io
+import os
+import json
+import zipfile
 import uvicorn
 
-from loanshark_ml import analyze_loan
+from loanshark_ml import analyze_loan, analyze_loan_stream
+from profiling import maybe_profile, PROFILE_HEADER
+from shadow import register_from_env, get_shadow_stats
+from result_cache import cache_from_env
+from jobs import queue_from_env
+from online_learning import OnlineLearner
+from compression import (
+    CompressResponseMiddleware,
+    DecompressRequestMiddleware,
+    DecompressionError,
+    MAX_DECOMPRESSED_BYTES,
+    read_upload,
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -18,6 +35,25 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Shadow scorers configured via LOANSHARK_SHADOW_MODELS
+register_from_env()
+
+# Shared on-disk result cache (opt-in via LOANSHARK_RESULT_CACHE=1)
+result_cache = cache_from_env()
+
+# Durable batch job queue processed by background workers (opt-in via
+# LOANSHARK_JOBS=1)
+job_queue = queue_from_env()
+
+# Reviewer feedback drives holdout-gated online model updates
+learner = OnlineLearner(
+    batch_size=int(os.environ.get("LOANSHARK_FEEDBACK_BATCH_SIZE", "32")),
+    holdout_path=os.environ.get("LOANSHARK_FEEDBACK_HOLDOUT") or None,
+    on_update=(
+        result_cache.refresh_model_version if result_cache is not None else None
+    ),
+)
+
 # CORS middleware for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -27,10 +63,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/zstd request bodies in, gzip responses out (above a size threshold)
+app.add_middleware(DecompressRequestMiddleware)
+app.add_middleware(CompressResponseMiddleware)
+
 
 # Request/Response Models
 class AnalyzeRequest(BaseModel):
     text: str
+    mode: Literal["full", "triage"] = "full"
 
     class Config:
         json_schema_extra = {
@@ -40,15 +81,62 @@ class AnalyzeRequest(BaseModel):
         }
 
 
+class JobRequest(BaseModel):
+    texts: list[str]
+    mode: Literal["full", "triage"] = "full"
+
+
+class FeedbackRequest(BaseModel):
+    text: str
+    predatory: bool
+
+
 class AnalyzeResponse(BaseModel):
+    """
+    `score` is always a number. Triage skips scoring contracts with APR above
+    400%: `score` is then the hard-floor score 85, a lower bound on the exact
+    score, and `score_is_floor` is true. It is omitted (false) otherwise.
+    """
+
     score: int
+    score_is_floor: bool = False
     label: str
-    confidence: str
+    confidence: Optional[str] = None
     reasons: list[str]
     highlights: list[dict]
     debug: Optional[dict] = None
 
 
+def run_analysis(text, mode="full"):
+    """Analyze with the server-wide result cache."""
+    return analyze_loan(text, mode=mode, result_cache=result_cache)
+
+
+@app.on_event("startup")
+def start_job_workers():
+    """Start background workers for the batch job queue."""
+    if job_queue is not None:
+        job_queue.start_workers(
+            run_analysis, num_workers=int(os.environ.get("LOANSHARK_JOB_WORKERS", "2"))
+        )
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    if job_queue is not None:
+        job_queue.stop_workers()
+
+
+def require_job_queue():
+    """Return the job queue, or raise 503 if batch jobs are disabled."""
+    if job_queue is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Batch jobs are disabled. Set LOANSHARK_JOBS=1 to enable them.",
+        )
+    return job_queue
+
+
 # API Endpoints
 
 
@@ -63,8 +151,11 @@ def root():
     }
 
 
-@app.post("/analyze", response_model=AnalyzeResponse)
-def analyze_loan_endpoint(request: AnalyzeRequest):
+@app.post("/analyze", response_model=AnalyzeResponse, response_model_exclude_unset=True)
+def analyze_loan_endpoint(
+    request: AnalyzeRequest,
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER),
+):
     """
     Analyze a loan contract for predatory patterns.
 
@@ -77,6 +168,11 @@ def analyze_loan_endpoint(request: AnalyzeRequest):
     - reasons: List of top reasons for the score
     - highlights: Dangerous text snippets with categories
     - debug: Internal scores (rule_score, ml_score, ml_prob)
+
+    **Modes**:
+    - full (default): complete analysis with reasons and highlights
+    - triage: score and label only. On the hard-floor APR it short-circuits
+      to label "Predatory" with score 85 and score_is_floor true
     """
     try:
         if not request.text or len(request.text.strip()) < 10:
@@ -86,7 +182,8 @@ def analyze_loan_endpoint(request: AnalyzeRequest):
             )
 
         # Analyze the loan
-        result = analyze_loan(request.text)
+        with maybe_profile("analyze", profile_token):
+            result = run_analysis(request.text, mode=request.mode)
 
         return result
 
@@ -94,16 +191,70 @@ def analyze_loan_endpoint(request: AnalyzeRequest):
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+@app.post("/analyze/stream")
+def analyze_stream_endpoint(request: AnalyzeRequest):
+    """
+    Analyze a loan contract, streaming results as server-sent events.
+
+    **Events** (in order):
+    - floor: hard-floor label and score (score_is_floor true), sent only when
+      APR alone fixes the label
+    - score: score, label, confidence
+    - reasons: list of top reasons
+    - highlight: one event per highlighted snippet
+    - result: final payload, identical to `POST /analyze`
+    - error: analysis failed (stream ends)
+
+    Only mode "full" is supported; use `POST /analyze` for triage.
+    """
+    if not request.text or len(request.text.strip()) < 10:
+        raise HTTPException(
+            status_code=400,
+            detail="Text is too short. Please provide a valid loan contract.",
+        )
+    if request.mode != "full":
+        raise HTTPException(
+            status_code=400,
+            detail="Streaming supports mode 'full' only. Use /analyze for triage.",
+        )
+
+    def events():
+        cached = None
+        if result_cache is not None:
+            cached = result_cache.get(request.text)
+        stages = (
+            [("result", cached)]
+            if cached is not None
+            else analyze_loan_stream(request.text)
+        )
+
+        try:
+            for event, data in stages:
+                if event == "result" and cached is None and result_cache is not None:
+                    result_cache.put(request.text, data)
+                yield f"event: {event}\ndata: {json.dumps(data, default=float)}\n\n"
+        except Exception as e:
+            error = {"detail": f"Analysis failed: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.post("/analyze/file")
-async def analyze_file_endpoint(file: UploadFile = File(...)):
+async def analyze_file_endpoint(
+    file: UploadFile = File(...),
+    mode: Literal["full", "triage"] = Query("full"),
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER),
+):
     """
     Analyze a loan contract from an uploaded file.
 
-    **Supported formats**: .txt files (PDF/image OCR to be added)
+    **Supported formats**: .txt files, optionally gzip/zstd-compressed
+    (PDF/image OCR to be added)
     """
     try:
-        # Read file content
-        content = await file.read()
+        # Read file content (transparently decompressed, size-capped)
+        content = await read_upload(file)
         text = content.decode("utf-8")
 
         if len(text.strip()) < 10:
@@ -112,10 +263,13 @@ async def analyze_file_endpoint(file: UploadFile = File(...)):
             )
 
         # Analyze the loan
-        result = analyze_loan(text)
+        with maybe_profile("analyze_file", profile_token):
+            result = run_analysis(text, mode=mode)
 
         return result
 
+    except DecompressionError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except UnicodeDecodeError:
         raise HTTPException(
             status_code=400,
@@ -125,6 +279,133 @@ async def analyze_file_endpoint(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+@app.post("/jobs")
+def submit_job(request: JobRequest):
+    """
+    Submit a batch of contract texts for background analysis.
+
+    Poll `GET /jobs/{job_id}` for progress and page through
+    `GET /jobs/{job_id}/results` for finished items.
+    """
+    queue = require_job_queue()
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="Batch contains no texts.")
+    for i, text in enumerate(request.texts):
+        if len(text.strip()) < 10:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Text {i} is too short. Please provide a valid loan contract.",
+            )
+
+    items = [(None, text) for text in request.texts]
+    job_id = queue.submit(items, mode=request.mode)
+
+    return queue.get_job(job_id)
+
+
+@app.post("/jobs/archive")
+async def submit_archive_job(
+    file: UploadFile = File(...),
+    mode: Literal["full", "triage"] = Query("full"),
+):
+    """
+    Submit a .zip archive of .txt contracts for background analysis.
+
+    Each .txt member becomes one job item, named by its path in the archive.
+    The archive itself may also be gzip/zstd-compressed.
+    """
+    queue = require_job_queue()
+    try:
+        content = await read_upload(file)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            # Declared sizes are enforced by zipfile, so this bounds inflation
+            if sum(info.file_size for info in archive.infolist()) > (
+                MAX_DECOMPRESSED_BYTES
+            ):
+                raise DecompressionError(
+                    "Archive contents exceed size limit", status_code=413
+                )
+            items = [
+                (info.filename, archive.read(info).decode("utf-8"))
+                for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(".txt")
+            ]
+    except DecompressionError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="File is not a valid zip archive.")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail="Archive encoding error. All .txt files must be UTF-8.",
+        )
+
+    if not items:
+        raise HTTPException(status_code=400, detail="Archive contains no .txt files.")
+    for name, text in items:
+        if len(text.strip()) < 10:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{name} is too short. Please provide a valid loan contract.",
+            )
+
+    job_id = queue.submit(items, mode=mode)
+
+    return queue.get_job(job_id)
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Get batch job progress."""
+    job = require_job_queue().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    return job
+
+
+@app.get("/jobs/{job_id}/results")
+def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Page through batch job items in submission order."""
+    page = require_job_queue().get_results(job_id, offset=offset, limit=limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    return page
+
+
+@app.post("/feedback")
+def submit_feedback(request: FeedbackRequest):
+    """
+    Submit a reviewer's corrected label for an analyzed contract.
+
+    Feedback is buffered and applied to the model in micro-batches. Each
+    updated model goes live only if it does not regress on the holdout set.
+    """
+    if not request.text or len(request.text.strip()) < 10:
+        raise HTTPException(
+            status_code=400,
+            detail="Text is too short. Please provide a valid loan contract.",
+        )
+
+    try:
+        update = learner.add_feedback(request.text, request.predatory)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"update": update, **learner.status()}
+
+
+@app.get("/feedback")
+def feedback_status():
+    """Online learning buffer and update counters."""
+    return learner.status()
+
+
 @app.get("/health")
 def health_check():
     """Detailed health check with model status."""
@@ -138,6 +419,8 @@ def health_check():
         "schema_loaded": schema is not None,
         "model_type": schema.get("model_type") if schema else None,
         "features_count": len(schema.get("feature_names", [])) if schema else 0,
+        "shadow": get_shadow_stats(),
+        "result_cache_entries": (len(result_cache) if result_cache is not None else 0),
     }
 
 
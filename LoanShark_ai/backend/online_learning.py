@@ -0,0 +1,332 @@
+"""
+LoanShark AI - Online Model Updates from Reviewer Feedback
+
+Reviewers submit corrected labels for analyzed contracts. Their feature
+vectors are buffered and applied to an incrementally trainable linear model
+(SGDClassifier with log loss, warm-started from the deployed
+LogisticRegression) in micro-batches, so each update costs the same regardless
+of how much feedback has accumulated.
+
+The buffer is a file shared by every process on the host, so uvicorn workers
+fill one batch between them and unapplied labels survive restarts. Updates run
+under a file lock and start from the newest checkpoint on disk, so one worker
+never overwrites another's update.
+
+Each updated model is evaluated on a holdout set the model was never trained
+on (the notebook's test split, saved as models/holdout.json) and only goes
+live if holdout accuracy does not regress. Accepted
+checkpoints are written atomically to model/models/online/ (untracked) with
+their own schema. Every process serves the latest one (see
+loanshark_ml.load_model_and_schema) until the batch model is retrained.
+"""
+
+import os
+import copy
+import json
+import time
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+from loanshark_ml import (
+    MODEL_DIR,
+    ONLINE_DIR,
+    ONLINE_SCHEMA_PATH,
+    extract_features,
+    build_model_input,
+    base_model_version,
+    load_model_and_schema,
+    set_model,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+ONLINE_MODEL_FILE = "loanshark_online_model.joblib"
+DATASET_PATH = Path(__file__).parent.parent / "model" / "dataset"
+CACHE_DIR = Path(__file__).parent / "cache"
+DEFAULT_FEEDBACK_LOG = CACHE_DIR / "feedback.jsonl"
+DEFAULT_PENDING_PATH = CACHE_DIR / "feedback_pending.jsonl"
+DEFAULT_LOCK_PATH = CACHE_DIR / "online_update.lock"
+
+
+def _atomic_write(path, write):
+    """Write via a temp file in the same directory, then rename over `path`."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock held across processes for the duration of the block."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10s; keep waiting
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def holdout_documents(schema, holdout_path=None):
+    """
+    (path, label) pairs of documents the live model was not trained on.
+
+    `holdout_path` is a directory with safe/ (0) and predatory/ (1) folders.
+    Without one, the schema's "holdout_file" lists the test split the
+    notebook held out of training.
+    """
+    if holdout_path is not None:
+        return [
+            (file_path, label)
+            for label, folder in ((0, "safe"), (1, "predatory"))
+            for file_path in sorted((Path(holdout_path) / folder).glob("*.txt"))
+        ]
+
+    holdout_file = schema.get("holdout_file")
+    if not holdout_file:
+        raise RuntimeError(
+            "No held-out split for this model: retrain with the notebook "
+            "(it saves models/holdout.json) or set LOANSHARK_FEEDBACK_HOLDOUT"
+        )
+    with open(MODEL_DIR / holdout_file, "r") as f:
+        documents = json.load(f)["documents"]
+    return [(DATASET_PATH / path, label) for path, label in documents]
+
+
+def load_holdout(schema, holdout_path=None):
+    """Load (texts, labels) of the holdout documents."""
+    documents = holdout_documents(schema, holdout_path)
+    texts = [path.read_text(encoding="utf-8") for path, _label in documents]
+    return texts, np.array([label for _path, label in documents])
+
+
+class OnlineLearner:
+    """Buffers feedback on disk and applies holdout-gated micro-batch updates."""
+
+    def __init__(
+        self,
+        batch_size=32,
+        learning_rate=1e-5,
+        tolerance=0.0,
+        holdout_path=None,
+        feedback_log=DEFAULT_FEEDBACK_LOG,
+        pending_path=DEFAULT_PENDING_PATH,
+        lock_path=DEFAULT_LOCK_PATH,
+        on_update=None,
+    ):
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.tolerance = tolerance
+        self.holdout_path = holdout_path
+        self.feedback_log = Path(feedback_log)
+        self.pending_path = Path(pending_path)
+        self.lock_path = Path(lock_path)
+        self.on_update = on_update
+
+        self._holdout = None
+        self.updates_applied = 0
+        self.updates_rejected = 0
+        self.last_update = None
+
+    def _schema(self, refresh=False):
+        model, schema = load_model_and_schema(refresh=refresh)
+        if model is None:
+            raise RuntimeError("No model loaded")
+        if schema.get("model_mode", "features") != "features":
+            raise RuntimeError("Online updates require the 'features' model mode")
+        return model, schema
+
+    def _get_holdout(self, schema):
+        # A retrained model brings its own split
+        key = schema.get("holdout_file")
+        if self._holdout is None or self._holdout[0] != key:
+            texts, labels = load_holdout(schema, self.holdout_path)
+            features_list = [extract_features(text) for text in texts]
+            X = build_model_input(texts, features_list, schema)
+            self._holdout = (key, X, labels)
+        return self._holdout[1:]
+
+    def _as_online_model(self, model):
+        """Copy the live model as an SGDClassifier that supports partial_fit."""
+        if isinstance(model, SGDClassifier):
+            return copy.deepcopy(model)
+
+        online = SGDClassifier(
+            loss="log_loss",
+            learning_rate="constant",
+            eta0=self.learning_rate,
+            alpha=1e-4,
+        )
+        # Warm start from the trained linear model's weights
+        online.coef_ = model.coef_.copy()
+        online.intercept_ = model.intercept_.copy()
+        online.classes_ = model.classes_.copy()
+        return online
+
+    def add_feedback(self, text, predatory, features=None):
+        """
+        Buffer one reviewer label (True = predatory) and run an update once
+        the shared buffer reaches batch_size. Returns the update report, if any.
+        """
+        _model, schema = self._schema()
+        # Fail before buffering if there is nothing to gate updates on
+        self._get_holdout(schema)
+        if features is None:
+            features = extract_features(text)
+
+        entry = {
+            "timestamp": time.time(),
+            "predatory": bool(predatory),
+            "features": dict(features),
+        }
+        self._log_feedback(entry)
+
+        with _file_lock(self.lock_path):
+            self._append_pending(entry)
+            pending = self._read_pending()
+            if len(pending) < self.batch_size:
+                return None
+            return self._update(pending)
+
+    def flush(self):
+        """Apply an update with whatever feedback is buffered."""
+        with _file_lock(self.lock_path):
+            pending = self._read_pending()
+            if not pending:
+                return None
+            return self._update(pending)
+
+    def _update(self, pending):
+        """Partial-fit a candidate on the buffer; promote it if the holdout allows."""
+        # Start from the newest checkpoint, which another worker may have written
+        live_model, schema = self._schema(refresh=True)
+        texts = [""] * len(pending)  # "features" mode needs no text
+        X = build_model_input(texts, [entry["features"] for entry in pending], schema)
+        y = np.array([1 if entry["predatory"] else 0 for entry in pending])
+
+        candidate = self._as_online_model(live_model)
+        candidate.partial_fit(X, y, classes=np.array([0, 1]))
+
+        X_holdout, y_holdout = self._get_holdout(schema)
+        live_accuracy = float(np.mean(live_model.predict(X_holdout) == y_holdout))
+        candidate_accuracy = float(np.mean(candidate.predict(X_holdout) == y_holdout))
+        accepted = candidate_accuracy >= live_accuracy - self.tolerance
+
+        report = {
+            "timestamp": time.time(),
+            "batch_size": len(y),
+            "live_accuracy": live_accuracy,
+            "candidate_accuracy": candidate_accuracy,
+            "accepted": accepted,
+        }
+
+        if accepted:
+            self._checkpoint(candidate, schema, candidate_accuracy)
+            self.updates_applied += 1
+            if self.on_update is not None:
+                self.on_update()
+        else:
+            self.updates_rejected += 1
+
+        # Applied or rejected, a batch is only consumed once
+        self._clear_pending()
+        self.last_update = report
+        return report
+
+    def _checkpoint(self, model, schema, holdout_accuracy):
+        """Atomically persist the model and its schema, and swap it live."""
+        ONLINE_DIR.mkdir(parents=True, exist_ok=True)
+        model_path = ONLINE_DIR / ONLINE_MODEL_FILE
+        _atomic_write(model_path, lambda f: joblib.dump(model, f))
+
+        new_schema = {
+            **schema,
+            "model_file": f"{ONLINE_DIR.name}/{ONLINE_MODEL_FILE}",
+            "model_type": "SGD Logistic Regression (online)",
+            "online_updates": schema.get("online_updates", 0) + 1,
+            "holdout_accuracy": holdout_accuracy,
+            # Ties the checkpoint to the batch model it was trained from
+            "base_version": schema.get("base_version") or base_model_version(),
+        }
+        _atomic_write(
+            ONLINE_SCHEMA_PATH,
+            lambda f: f.write(json.dumps(new_schema, indent=2).encode()),
+        )
+
+        set_model(model, new_schema)
+
+    def _log_feedback(self, entry):
+        """Append raw feedback for auditing and offline retraining."""
+        try:
+            self.feedback_log.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.feedback_log, "a") as f:
+                f.write(json.dumps(entry, default=float) + "\n")
+        except Exception as e:
+            print(f"⚠ Error writing feedback log: {e}")
+
+    def _append_pending(self, entry):
+        """Add feedback to the shared buffer (call with the file lock held)."""
+        self.pending_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.pending_path, "a") as f:
+            f.write(json.dumps(entry, default=float) + "\n")
+
+    def _read_pending(self):
+        """Buffered feedback not yet applied, from every process."""
+        try:
+            with open(self.pending_path, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+
+        pending = []
+        for line in lines:
+            try:
+                pending.append(json.loads(line))
+            except ValueError:
+                # Torn line from a crash mid-write
+                continue
+        return pending
+
+    def _clear_pending(self):
+        open(self.pending_path, "w").close()
+
+    def status(self):
+        """Shared buffer size and this process's update counters."""
+        return {
+            "buffered": len(self._read_pending()),
+            "batch_size": self.batch_size,
+            "updates_applied": self.updates_applied,
+            "updates_rejected": self.updates_rejected,
+            "last_update": self.last_update,
+        }
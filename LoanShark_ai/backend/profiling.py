@@ -0,0 +1,99 @@
+"""
+LoanShark AI - On-demand Request Profiling
+
+Opt-in cProfile hooks for diagnosing slow analyses in place.
+
+Profiling is enabled either:
+- globally via LOANSHARK_PROFILE=1, sampling LOANSHARK_PROFILE_SAMPLE_RATE of requests
+- per request via the X-LoanShark-Profile header, if its value is listed in
+  LOANSHARK_PROFILE_TOKENS (comma-separated admin allowlist)
+
+Profiles are written as pstats files to LOANSHARK_PROFILE_DIR. Oldest files are
+removed once the directory exceeds LOANSHARK_PROFILE_MAX_BYTES.
+"""
+
+import os
+import time
+import random
+import cProfile
+from pathlib import Path
+from contextlib import contextmanager
+
+
+PROFILE_HEADER = "X-LoanShark-Profile"
+
+_enabled = os.environ.get("LOANSHARK_PROFILE", "0").lower() in ("1", "true", "yes")
+_sample_rate = float(os.environ.get("LOANSHARK_PROFILE_SAMPLE_RATE", "0.01"))
+_admin_tokens = {
+    token.strip()
+    for token in os.environ.get("LOANSHARK_PROFILE_TOKENS", "").split(",")
+    if token.strip()
+}
+_profile_dir = Path(
+    os.environ.get(
+        "LOANSHARK_PROFILE_DIR", Path(__file__).parent / "profiles"
+    )
+)
+_max_bytes = int(os.environ.get("LOANSHARK_PROFILE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def should_profile(token=None):
+    """Decide whether the current request should be profiled."""
+    # Admin override: header token must be on the allowlist
+    if token is not None and token in _admin_tokens:
+        return True
+
+    if not _enabled:
+        return False
+
+    return random.random() < _sample_rate
+
+
+def _rotate_profiles():
+    """Delete oldest profiles until the directory fits within the size budget."""
+    files = sorted(_profile_dir.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in files)
+
+    while files and total > _max_bytes:
+        oldest = files.pop(0)
+        total -= oldest.stat().st_size
+        oldest.unlink(missing_ok=True)
+
+
+def _write_profile(profiler, name):
+    """Dump profiler stats to the profile directory and rotate old files."""
+    try:
+        _profile_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        filename = f"{name}-{timestamp}-{os.getpid()}-{random.randrange(1 << 16):04x}.prof"
+        profiler.dump_stats(_profile_dir / filename)
+        _rotate_profiles()
+    except Exception as e:
+        print(f"⚠ Error writing profile: {e}")
+
+
+@contextmanager
+def maybe_profile(name, token=None):
+    """
+    Profile the enclosed block if this request is sampled.
+
+    Unsampled requests only pay for the sampling check.
+    Inspect results with: python -m pstats <file>.prof
+    """
+    if not should_profile(token):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active (e.g. a concurrent sampled request)
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _write_profile(profiler, name)
@@ -0,0 +1,223 @@
+"""
+LoanShark AI - Persistent Result Cache
+
+SQLite-backed store for analyze_loan outputs, shared by every process on a host
+(uvicorn workers, scripts, notebooks) and surviving restarts.
+
+Entries are keyed by content hash + analysis mode + model version, where the
+model version is a hash of the served model and schema artifacts. Their mtimes
+are re-checked every few seconds, and entries written for other model versions
+are purged, so retraining or an online update in any process invalidates the
+cache for all. TTL expiry and size-bounded LRU eviction keep the file small.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+from loanshark_ml import (
+    artifact_version,
+    get_model_path,
+    read_active_schema,
+    artifact_mtimes,
+)
+
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "cache" / "results.sqlite3"
+
+# Eviction scans the access index, so it runs every N writes rather than on each
+EVICT_EVERY = 100
+
+# How often (seconds) to stat the model artifacts for changes
+VERSION_CHECK_SECONDS = 5
+
+
+def current_artifacts():
+    """(model path, schema path) currently served (see read_active_schema)."""
+    schema, schema_path = read_active_schema()
+    return get_model_path(schema), schema_path
+
+
+def current_model_version():
+    """Version of the artifacts currently served."""
+    return artifact_version(*current_artifacts())
+
+
+class ResultCache:
+    """Cross-process analyze_loan result cache backed by a WAL-mode SQLite file."""
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        model_version=None,
+        ttl_seconds=7 * 24 * 3600,
+        max_entries=100000,
+    ):
+        self._track_artifacts = model_version is None
+        self._artifact_mtimes = ()
+        self._checked_at = time.monotonic()
+        if self._track_artifacts:
+            self._artifact_mtimes = artifact_mtimes()
+            model_version = current_model_version()
+
+        self.path = Path(path)
+        self.model_version = model_version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    model_version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)"
+            )
+        self._purge_other_versions()
+
+    def _purge_other_versions(self):
+        """Invalidate entries produced by other model/schema artifacts."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM results WHERE model_version != ?", (self.model_version,)
+            )
+
+    def refresh_model_version(self):
+        """Re-hash the model artifacts (call after swapping the live model)."""
+        self._artifact_mtimes = artifact_mtimes()
+        self._checked_at = time.monotonic()
+
+        version = current_model_version()
+        if version != self.model_version:
+            self.model_version = version
+            self._purge_other_versions()
+
+    def _check_model_version(self):
+        """Pick up artifacts changed by another process (at most every few seconds)."""
+        if not self._track_artifacts:
+            return
+        if time.monotonic() - self._checked_at < VERSION_CHECK_SECONDS:
+            return
+
+        self._checked_at = time.monotonic()
+        # Retrains and online checkpoints rewrite a schema or a model file
+        if artifact_mtimes() != self._artifact_mtimes:
+            try:
+                self.refresh_model_version()
+            except Exception as e:
+                print(f"⚠ Error re-hashing model artifacts: {e}")
+
+    def _connect(self):
+        """Return this thread's connection (sqlite3 connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, text, mode):
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{content_hash}:{mode}:{self.model_version}"
+
+    def get(self, text, mode="full"):
+        """Return the cached result for `text`, or None if missing/expired."""
+        self._check_model_version()
+        conn = self._connect()
+        key = self._key(text, mode)
+        now = time.time()
+
+        row = conn.execute(
+            "SELECT result, created_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        result, created_at = row
+        with conn:
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE results SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+
+        return json.loads(result)
+
+    def put(self, text, result, mode="full"):
+        """Store a result, periodically evicting least recently used entries."""
+        self._check_model_version()
+        conn = self._connect()
+        now = time.time()
+        self._writes += 1
+
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (
+                    self._key(text, mode),
+                    self.model_version,
+                    json.dumps(result, default=float),
+                    now,
+                    now,
+                ),
+            )
+
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Delete expired entries and least recently used ones beyond max_entries."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM results WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            conn.execute(
+                """
+                DELETE FROM results WHERE key IN (
+                    SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        """Remove all entries."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM results")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def cache_from_env():
+    """Build a ResultCache from LOANSHARK_RESULT_CACHE* settings, or None if disabled."""
+    enabled = os.environ.get("LOANSHARK_RESULT_CACHE", "0").lower()
+    if enabled not in ("1", "true", "yes"):
+        return None
+
+    return ResultCache(
+        path=os.environ.get("LOANSHARK_RESULT_CACHE_PATH", DEFAULT_CACHE_PATH),
+        ttl_seconds=int(os.environ.get("LOANSHARK_RESULT_CACHE_TTL", 7 * 24 * 3600)),
+        max_entries=int(os.environ.get("LOANSHARK_RESULT_CACHE_MAX_ENTRIES", 100000)),
+    )
@@ -0,0 +1,199 @@
+"""
+LoanShark AI - Shadow Scoring
+
+Runs candidate models / rule sets on live traffic without affecting responses.
+
+Shadow scorers receive the features already extracted for the primary request
+and run on a bounded background queue. When the queue is full, work is dropped
+rather than slowing down the caller. Each scorer is compared like-for-like with
+one of the primary request's scores: rule sets against rule_score, candidate
+models against ml_score, full hybrid replacements against the final score.
+Disagreements are appended as JSON lines to LOANSHARK_SHADOW_LOG for offline
+comparison.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+
+import joblib
+
+_queue_size = int(os.environ.get("LOANSHARK_SHADOW_QUEUE_SIZE", "1000"))
+_disagreement_threshold = int(os.environ.get("LOANSHARK_SHADOW_THRESHOLD", "10"))
+_log_path = Path(
+    os.environ.get(
+        "LOANSHARK_SHADOW_LOG", Path(__file__).parent / "shadow_disagreements.jsonl"
+    )
+)
+
+_scorers = {}
+_queue = queue.Queue(maxsize=_queue_size)
+_worker = None
+_worker_lock = threading.Lock()
+_stats = {"submitted": 0, "dropped": 0, "scored": 0, "disagreements": 0, "errors": 0}
+
+# Primary scores a shadow scorer can be compared against (hybrid_score keys)
+SHADOW_TARGETS = ("score", "rule_score", "ml_score")
+
+
+def register_shadow_scorer(name, scorer, compare_to="rule_score", with_text=False):
+    """
+    Register a shadow scorer.
+
+    `scorer` is a callable taking the primary request's feature record (and
+    the contract text as a second argument if `with_text`) and returning a
+    0-100 score. `compare_to` names the primary score it replaces:
+    "rule_score" for rule sets (e.g. a re-weighted calculate_rule_score),
+    "ml_score" for candidate models, "score" for the final hybrid score.
+    """
+    if compare_to not in SHADOW_TARGETS:
+        raise ValueError(f"compare_to must be one of {SHADOW_TARGETS}")
+
+    _scorers[name] = (scorer, compare_to, with_text)
+    _ensure_worker()
+
+
+def unregister_shadow_scorer(name):
+    """Remove a shadow scorer (no-op if not registered)."""
+    _scorers.pop(name, None)
+
+
+def model_scorer(model, schema):
+    """
+    Wrap a candidate sklearn model as a shadow scorer (register with_text=True).
+
+    Input is built from the candidate's own schema, so any model mode works
+    (e.g. hashed n-grams, which need the text as well as the features).
+    """
+    from loanshark_ml import MODEL_MODES, build_model_input
+
+    mode = schema.get("model_mode", "features")
+    if mode not in MODEL_MODES:
+        raise ValueError(f"Unsupported model mode for shadow scoring: {mode}")
+
+    def score(features, text):
+        model_input = build_model_input([text], [features], schema)
+        prob = model.predict_proba(model_input)[0][1]
+        return round(prob * 100)
+
+    return score
+
+
+def register_model_scorer(name, model_path, schema_path):
+    """Load a candidate model artifact + schema and register it as a shadow scorer."""
+    model = joblib.load(model_path)
+    with open(schema_path, "r") as f:
+        schema = json.load(f)
+
+    register_shadow_scorer(
+        name, model_scorer(model, schema), compare_to="ml_score", with_text=True
+    )
+
+
+def register_from_env():
+    """
+    Register shadow models listed in LOANSHARK_SHADOW_MODELS.
+
+    Format: comma-separated `model_path[=schema_path]` entries. Without a
+    schema path, the primary feature_schema.json is used.
+    """
+    spec = os.environ.get("LOANSHARK_SHADOW_MODELS", "")
+    default_schema = (
+        Path(__file__).parent.parent / "model" / "models" / "feature_schema.json"
+    )
+
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        model_path, _, schema_path = entry.partition("=")
+        try:
+            register_model_scorer(
+                Path(model_path).stem, model_path, schema_path or default_schema
+            )
+        except Exception as e:
+            print(f"⚠ Error loading shadow model {entry}: {e}")
+
+
+def submit_shadow(features, primary_scores, text=None):
+    """
+    Queue shadow scoring for a request. Never blocks; drops work under load.
+
+    `primary_scores` maps SHADOW_TARGETS to the primary request's values
+    (hybrid_score output can be passed as is). `text` is required by scorers
+    registered with_text (e.g. model scorers); they are skipped without it.
+    """
+    if not _scorers:
+        return
+
+    primary_scores = {target: primary_scores.get(target) for target in SHADOW_TARGETS}
+    _stats["submitted"] += 1
+    try:
+        _queue.put_nowait((features, primary_scores, text))
+    except queue.Full:
+        _stats["dropped"] += 1
+
+
+def get_shadow_stats():
+    """Counters for submitted / dropped / scored / disagreeing shadow work."""
+    return {**_stats, "scorers": list(_scorers), "queue_depth": _queue.qsize()}
+
+
+def _ensure_worker():
+    """Start the background worker thread once."""
+    global _worker
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run_worker, name="loanshark-shadow", daemon=True
+            )
+            _worker.start()
+
+
+def _run_worker():
+    """Score queued requests with every registered scorer."""
+    while True:
+        features, primary_scores, text = _queue.get()
+        try:
+            for name, (scorer, compare_to, with_text) in list(_scorers.items()):
+                primary_score = primary_scores[compare_to]
+                if primary_score is None or (with_text and text is None):
+                    # e.g. no primary model loaded to compare a candidate with
+                    continue
+
+                try:
+                    if with_text:
+                        shadow_score = scorer(features, text)
+                    else:
+                        shadow_score = scorer(features)
+                except Exception as e:
+                    _stats["errors"] += 1
+                    print(f"⚠ Shadow scorer {name} failed: {e}")
+                    continue
+
+                _stats["scored"] += 1
+                if abs(shadow_score - primary_score) >= _disagreement_threshold:
+                    _stats["disagreements"] += 1
+                    _log_disagreement(
+                        name, compare_to, primary_score, shadow_score, features
+                    )
+        finally:
+            _queue.task_done()
+
+
+def _log_disagreement(name, compared_to, primary_score, shadow_score, features):
+    """Append a disagreement record to the shadow log."""
+    record = {
+        "timestamp": time.time(),
+        "scorer": name,
+        "compared_to": compared_to,
+        "primary_score": primary_score,
+        "shadow_score": shadow_score,
+        "features": dict(features),
+    }
+    try:
+        with open(_log_path, "a") as f:
+            f.write(json.dumps(record, default=float) + "\n")
+    except Exception as e:
+        print(f"⚠ Error writing shadow log: {e}")
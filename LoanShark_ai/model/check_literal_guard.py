@@ -0,0 +1,179 @@
+"""
+LoanShark AI - Literal Guard Equivalence Check
+
+Verifies that extract_features, which skips the regex of any clause pattern
+whose leading literal is absent from the text (loanshark_ml.may_match),
+produces the same features as running every regex. The check covers every
+dataset document plus layouts with clauses under unexpected headings. It then
+times both on the dataset and on documents repeated 10x.
+
+Usage:
+    python check_literal_guard.py [dataset_dir]
+
+Exits with status 1 if any document's features differ.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+MODEL_ROOT = Path(__file__).parent
+sys.path.insert(0, str(MODEL_ROOT.parent / "backend"))
+
+import loanshark_ml  # noqa: E402
+from loanshark_ml import extract_features  # noqa: E402
+
+# Clauses, fees and APRs under headings that do not announce them
+LAYOUTS = {
+    "arbitration under terms and conditions": (
+        "LOAN AGREEMENT\n"
+        "REPAYMENT TERMS:\n"
+        "Late Fee: $40\n"
+        "TERMS AND CONDITIONS:\n"
+        "Any dispute will be resolved by binding arbitration. You waive your\n"
+        "right to a jury trial and agree to a class action waiver.\n"
+        "FEES:\n"
+        "APR: 450%\n"
+    ),
+    "legal waivers under default": (
+        "PAYDAY LOAN\n"
+        "Loan Amount: $500\n"
+        "FEES AND CHARGES:\n"
+        "Service Fee: $75\n"
+        "DEFAULT AND REMEDIES:\n"
+        "Upon default, claims go to binding arbitration and you waive any jury.\n"
+        "No class action may be brought.\n"
+        "Confession of judgment is authorized.\n"
+    ),
+    "fees under repayment and renewal": (
+        "INSTALLMENT LOAN\n"
+        "PAYMENT SCHEDULE:\n"
+        "Term: 30 days, single payment due on payday.\n"
+        "Late Fee: $35\n"
+        "ROLLOVER:\n"
+        "This loan may renew automatically.\n"
+        "Renewal Fee: $50\n"
+        "DISCLOSURES:\n"
+        "APR: 390%\n"
+    ),
+    "dispute language under repayment": (
+        "CONSUMER LOAN\n"
+        "LOAN TERM:\n"
+        "Term: 6 months. Disputes are subject to binding arbitration.\n"
+        "COST OF CREDIT:\n"
+        "APR: 35%\n"
+        "Origination Fee: $20\n"
+    ),
+    "APR under renewal": (
+        "PAYDAY LOAN\n"
+        "FEES:\n"
+        "Late Fee: $30\n"
+        "RENEWAL:\n"
+        "The renewal APR: 600% applies.\n"
+    ),
+    "legal waivers under payment authorization": (
+        "CASH ADVANCE\n"
+        "LOAN TERM:\n"
+        "Term: 14 days\n"
+        "PAYMENT AUTHORIZATION:\n"
+        "Claims go to binding arbitration and you agree to a class action waiver.\n"
+    ),
+    "wage assignment under payments": (
+        "CONSUMER LOAN\n"
+        "FEES:\n"
+        "Service Fee: $25\n"
+        "PAYMENTS:\n"
+        "You agree to a wage assignment if a payment is missed.\n"
+    ),
+    "continuous debit under arbitration": (
+        "PAYDAY LOAN\n"
+        "FEES:\n"
+        "Late Fee: $30\n"
+        "ARBITRATION:\n"
+        "Disputes go to arbitration.\n"
+        "We may debit your account repeatedly until paid.\n"
+    ),
+    "rollover under authorization": (
+        "PAYDAY LOAN\n"
+        "COST OF CREDIT:\n"
+        "APR: 390%\n"
+        "AUTHORIZATION:\n"
+        "You authorize a rollover of any unpaid balance.\n"
+    ),
+    "fee ambiguity under payment schedule": (
+        "INSTALLMENT LOAN\n"
+        "DISPUTES:\n"
+        "Disputes are heard in small claims court.\n"
+        "PAYMENT SCHEDULE:\n"
+        "Monthly payments. Additional fees may apply.\n"
+    ),
+}
+
+
+def extract_unguarded(text):
+    """extract_features with every pattern's regex run (no literal guard)."""
+    may_match = loanshark_ml.may_match
+    loanshark_ml.may_match = lambda pattern, lowered: True
+    try:
+        return extract_features(text)
+    finally:
+        loanshark_ml.may_match = may_match
+
+
+def time_per_doc(extract, texts, repeats=5):
+    """Best-of-`repeats` milliseconds per document."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in texts:
+            extract(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1000
+
+
+def main():
+    dataset_path = Path(sys.argv[1]) if len(sys.argv) > 1 else MODEL_ROOT / "dataset"
+    files = sorted(dataset_path.glob("*/*.txt"))
+
+    documents = [
+        (
+            str(file_path.relative_to(dataset_path)),
+            file_path.read_text(encoding="utf-8"),
+        )
+        for file_path in files
+    ] + [(f"layout: {name}", text) for name, text in LAYOUTS.items()]
+
+    mismatches = 0
+    for name, text in documents:
+        expected = extract_unguarded(text)
+        actual = extract_features(text)
+        diff = {
+            feature: (expected[feature], actual[feature])
+            for feature in expected
+            if expected[feature] != actual[feature]
+        }
+        if diff:
+            mismatches += 1
+            print(f"✗ {name}: {diff}")
+
+    print(f"\nDocuments checked: {len(documents)}")
+    if mismatches:
+        print(f"⚠ {mismatches} document(s) differ from running every regex")
+        sys.exit(1)
+    print("✓ Guarded extraction matches running every regex on all documents")
+
+    texts = [text for _name, text in documents]
+    for label, batch in (
+        ("dataset", texts),
+        ("10x", ["\n".join([t] * 10) for t in texts]),
+    ):
+        unguarded = time_per_doc(extract_unguarded, batch)
+        guarded = time_per_doc(extract_features, batch)
+        print(
+            f"  {label}: {unguarded:.3f} ms/doc unguarded, {guarded:.3f} ms/doc "
+            f"guarded ({unguarded / guarded:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+LoanShark AI - Hashed N-gram Model Training
+
+Trains the "hashed_ngrams" model mode: a linear model over stateless hashed
+word n-grams, stacked with the hand-crafted features. No vocabulary is stored,
+so the artifact stays small and inference batches natively on sparse matrices.
+
+Usage:
+    python train_hashed_model.py              # writes models/*_hashed.* only
+    python train_hashed_model.py --activate   # also switches feature_schema.json
+
+The backend selects the model through feature_schema.json ("model_mode" and
+"model_file"), so --activate is all that is needed to serve the new model. It
+merges only those pointer keys into the schema, keeping the notebook's metrics
+and holdout_file; the schema it replaces is saved as feature_schema.json.bak.
+"""
+
+import sys
+import json
+import shutil
+import argparse
+from pathlib import Path
+
+import joblib
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MaxAbsScaler
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+MODEL_ROOT = Path(__file__).parent
+sys.path.insert(0, str(MODEL_ROOT.parent / "backend"))
+
+from loanshark_ml import extract_features, build_model_input  # noqa: E402
+
+
+RANDOM_STATE = 42
+MODEL_FILE = "loanshark_hashed_model.joblib"
+
+# Schema keys that select and describe the served model. --activate merges only
+# these, so the rest of feature_schema.json (metrics, holdout_file) survives
+POINTER_KEYS = ("model_mode", "model_file", "hashing", "model_type")
+
+
+def load_dataset(dataset_path=MODEL_ROOT / "dataset"):
+    """Load loan texts with labels (0 = safe, 1 = predatory)."""
+    texts, labels = [], []
+    for label, folder in ((0, "safe"), (1, "predatory")):
+        for file_path in sorted((Path(dataset_path) / folder).glob("*.txt")):
+            texts.append(file_path.read_text(encoding="utf-8"))
+            labels.append(label)
+    return texts, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n-features", type=int, default=2**18)
+    parser.add_argument("--ngram-max", type=int, default=2)
+    parser.add_argument("--no-stack", action="store_true", help="n-grams only")
+    parser.add_argument("--activate", action="store_true")
+    args = parser.parse_args()
+
+    with open(MODEL_ROOT / "models" / "feature_schema.json", "r") as f:
+        base_schema = json.load(f)
+
+    schema = {
+        "feature_names": base_schema["feature_names"],
+        "model_mode": "hashed_ngrams",
+        "model_file": MODEL_FILE,
+        "hashing": {
+            "n_features": args.n_features,
+            "ngram_range": [1, args.ngram_max],
+            "stack_features": not args.no_stack,
+        },
+        "model_type": "Logistic Regression (hashed n-grams)",
+    }
+
+    texts, labels = load_dataset()
+    features_list = [extract_features(text) for text in texts]
+    X = build_model_input(texts, features_list, schema)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, labels, test_size=0.2, random_state=RANDOM_STATE, stratify=labels
+    )
+
+    # MaxAbsScaler keeps the matrix sparse while bringing raw feature values
+    # (APR, word counts) onto the same scale as the normalized n-grams
+    model = Pipeline(
+        [
+            ("scale", MaxAbsScaler()),
+            ("clf", LogisticRegression(random_state=RANDOM_STATE, max_iter=1000)),
+        ]
+    )
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    schema["metrics"] = {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "f1_predatory": f1_score(y_test, y_pred),
+        "precision_safe": precision_score(y_test, y_pred, pos_label=0),
+        "precision_predatory": precision_score(y_test, y_pred),
+        "recall_predatory": recall_score(y_test, y_pred),
+    }
+    schema["trained_on_samples"] = X_train.shape[0]
+
+    models_dir = MODEL_ROOT / "models"
+    joblib.dump(model, models_dir / MODEL_FILE)
+    with open(models_dir / "feature_schema_hashed.json", "w") as f:
+        json.dump(schema, f, indent=2)
+
+    print(f"✓ Model saved to {models_dir / MODEL_FILE}")
+    for name, value in schema["metrics"].items():
+        print(f"  {name}: {value:.3f}")
+
+    if args.activate:
+        schema_path = models_dir / "feature_schema.json"
+        backup_path = models_dir / "feature_schema.json.bak"
+        # Back up the schema of the features model, not an earlier activation
+        if base_schema.get("model_mode", "features") == "features":
+            shutil.copyfile(schema_path, backup_path)
+
+        active_schema = {**base_schema, **{key: schema[key] for key in POINTER_KEYS}}
+        with open(schema_path, "w") as f:
+            json.dump(active_schema, f, indent=2)
+        print("✓ feature_schema.json now selects the hashed n-gram model")
+        print(f"  Previous schema saved to {backup_path}")
+
+
+if __name__ == "__main__":
+    main()